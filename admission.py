@@ -0,0 +1,138 @@
+import math
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+
+class Overloaded(Exception):
+    """Raised when a lane cannot take a request; maps to HTTP 429"""
+
+    def __init__(self, lane, reason, retry_after):
+        super().__init__(f"Lane '{lane}' is overloaded ({reason})")
+        self.lane = lane
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class Lane:
+    """
+    One workload class: at most `max_concurrent` requests run at once, at
+    most `max_queue` wait behind them (FIFO), and nobody waits longer than
+    `max_wait` seconds. Anything beyond that is rejected immediately.
+    """
+
+    def __init__(self, name, max_concurrent, max_queue, max_wait):
+        self.name = name
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+
+        self._cond = threading.Condition()
+        self._waiters = deque()
+        self.in_flight = 0
+        self.admitted = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self._wait_times = deque(maxlen=1000)
+        self._service_times = deque(maxlen=1000)
+
+    def _retry_after(self):
+        # Rough time for the current backlog to drain, in whole seconds
+        service = (sum(self._service_times) / len(self._service_times)) if self._service_times else 1.0
+        backlog = len(self._waiters) + self.in_flight
+        return max(1, math.ceil(service * backlog / self.max_concurrent))
+
+    @contextmanager
+    def admit(self):
+        enqueued = time.monotonic()
+        with self._cond:
+            if self.in_flight >= self.max_concurrent or self._waiters:
+                if len(self._waiters) >= self.max_queue:
+                    self.rejected += 1
+                    raise Overloaded(self.name, "queue full", self._retry_after())
+
+                ticket = object()
+                self._waiters.append(ticket)
+                deadline = enqueued + self.max_wait
+                while self.in_flight >= self.max_concurrent or self._waiters[0] is not ticket:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._waiters.remove(ticket)
+                        self.timed_out += 1
+                        self._cond.notify_all()
+                        raise Overloaded(self.name, "queue wait exceeded", self._retry_after())
+                    self._cond.wait(remaining)
+                self._waiters.popleft()
+
+            self.in_flight += 1
+            self.admitted += 1
+            started = time.monotonic()
+            self._wait_times.append(started - enqueued)
+            # The next waiter may also fit if capacity is left
+            self._cond.notify_all()
+
+        try:
+            yield
+        finally:
+            with self._cond:
+                self.in_flight -= 1
+                self._service_times.append(time.monotonic() - started)
+                self._cond.notify_all()
+
+    def snapshot(self):
+        with self._cond:
+            waits = sorted(self._wait_times)
+            services = list(self._service_times)
+            return {
+                "max_concurrent": self.max_concurrent,
+                "max_queue": self.max_queue,
+                "in_flight": self.in_flight,
+                "queue_depth": len(self._waiters),
+                "admitted": self.admitted,
+                "rejected": self.rejected,
+                "timed_out": self.timed_out,
+                "wait_ms_avg": round(1000 * sum(waits) / len(waits), 2) if waits else 0.0,
+                "wait_ms_p95": round(1000 * waits[math.ceil(0.95 * len(waits)) - 1], 2) if waits else 0.0,
+                "service_ms_avg": round(1000 * sum(services) / len(services), 2) if services else 0.0,
+            }
+
+
+class AdmissionController:
+    """
+    Bounded lanes per workload class, so a burst of long documents can only
+    fill its own lane and cheap requests keep their own capacity.
+    """
+
+    def __init__(self, lanes):
+        self.lanes = {lane.name: lane for lane in lanes}
+
+    @classmethod
+    def from_env(cls, defaults):
+        """
+        `defaults` maps lane name -> (max_concurrent, max_queue, max_wait).
+        Each value can be overridden with ADMISSION_<LANE>_CONCURRENCY,
+        ADMISSION_<LANE>_QUEUE and ADMISSION_<LANE>_MAX_WAIT.
+        """
+        lanes = []
+        for name, (concurrency, queue, max_wait) in defaults.items():
+            prefix = f"ADMISSION_{name.upper()}"
+            lanes.append(Lane(
+                name,
+                max_concurrent=int(os.getenv(f"{prefix}_CONCURRENCY", concurrency)),
+                max_queue=int(os.getenv(f"{prefix}_QUEUE", queue)),
+                max_wait=float(os.getenv(f"{prefix}_MAX_WAIT", max_wait))
+            ))
+        return cls(lanes)
+
+    @property
+    def capacity(self):
+        """Requests the lanes can hold at once, running plus queued"""
+        return sum(lane.max_concurrent + lane.max_queue for lane in self.lanes.values())
+
+    def admit(self, lane):
+        return self.lanes[lane].admit()
+
+    def snapshot(self):
+        return {name: lane.snapshot() for name, lane in self.lanes.items()}
@@ -1,29 +1,107 @@
 from flask import Flask, request, jsonify
 from flask_cors import CORS
-from classifier import TextClassifier
 from labels import CATEGORIES
-from summarizer import blogsummarizer
-from keyword_extractor import KeywordExtractor, extract_and_update_keywords
+from summary_profiles import QUALITY_TIERS
+from coalescer import SingleFlight, request_key
+from admission import AdmissionController, Overloaded
+from near_duplicate import NearDuplicateIndex
 import json
 import os
 from dotenv import load_dotenv
 
 load_dotenv()
 
+if os.getenv("BLOGAI_MOCK_MODELS") == "1":
+    # Synthetic-latency stand-ins for load testing the serving layer
+    from mock_models import (
+        MockClassifier as TextClassifier,
+        MockSummarizer as blogsummarizer,
+        MockKeywordExtractor as KeywordExtractor,
+        extract_and_update_keywords
+    )
+else:
+    from classifier import TextClassifier
+    from summarizer import blogsummarizer
+    from keyword_extractor import KeywordExtractor, extract_and_update_keywords
+
 app = Flask(__name__)
 CORS(app)
 
-classifier = TextClassifier()
-summarizer = blogsummarizer()
 keyword_extractor = KeywordExtractor()
+# The classifier scores against the extractor's vocabulary snapshot rather
+# than embedding and storing the categories a second time
+classifier = TextClassifier(vocabulary=keyword_extractor)
+summarizer = blogsummarizer()
+# Identical concurrent requests share one model run
+inflight = SingleFlight()
+
+# Near-duplicate posts (syndicated, lightly reworded) reuse earlier results;
+# set NEAR_DUP_INDEX_PATH to an empty string to keep the index in memory only
+near_duplicates = NearDuplicateIndex(
+    path=os.getenv("NEAR_DUP_INDEX_PATH", "near_duplicates.jsonl") or None,
+    threshold=float(os.getenv("NEAR_DUP_THRESHOLD", "0.9"))
+)
+
+# Documents longer than this go to the long summarization lane
+LONG_DOCUMENT_CHARS = int(os.getenv("LONG_DOCUMENT_CHARS", "5000"))
+# lane -> (max concurrent, max queued, max queue wait in seconds)
+admission = AdmissionController.from_env({
+    "classify": (4, 16, 10),
+    "summarize_short": (2, 8, 30),
+    "summarize_long": (1, 2, 60),
+})
+# Queued requests hold a server thread. If the lanes can hold as many
+# requests as there are threads, a full lane keeps the others from ever
+# being admitted or rejected
+SERVER_THREADS = int(os.getenv("SERVER_THREADS", "40"))
+if admission.capacity >= SERVER_THREADS:
+    print(f"Warning: admission lanes hold up to {admission.capacity} requests but the server "
+          f"has {SERVER_THREADS} threads; raise SERVER_THREADS or lower the lane queues")
+
+
+def _admitted(lane, fn, *args):
+    with admission.admit(lane):
+        return fn(*args)
+
+
+def _reuse(match, result_kind):
+    record, similarity = match
+    result = dict(record['result'])
+    result['near_duplicate'] = {
+        'matched_id': record['id'],
+        'matched_title': record.get('title'),
+        'similarity': round(similarity, 3),
+        'analyzed_at': record['analyzed_at'],
+        'reused': result_kind
+    }
+    return result
+
+
+def _overloaded(e):
+    response = jsonify({'success': False, 'error': str(e), 'lane': e.lane})
+    response.headers['Retry-After'] = str(e.retry_after)
+    return response, 429
+
 
 @app.route("/", methods=["GET"])
 def health():
     return {"status": "BlogAI API is running"}, 200
 
+@app.route("/api/metrics", methods=["GET"])
+def metrics():
+    return jsonify({
+        "coalescing": inflight.snapshot(),
+        "admission": admission.snapshot(),
+        "summary_costs": summarizer.cost_model.snapshot(),
+        "chunk_cache": summarizer.chunk_cache.snapshot(),
+        "near_duplicates": near_duplicates.snapshot()
+    }), 200
+
 @app.route("/api/categories", methods=["GET"])
 def get_categories():
-    return jsonify({"categories": CATEGORIES}), 200
+    # Live vocabulary, including keywords added since start-up
+    categories = {category: list(keywords) for category, keywords in keyword_extractor.categories.items()}
+    return jsonify({"categories": categories}), 200
 
 @app.route('/api/blog', methods=['POST'])
 def analyse_blog():
@@ -37,21 +115,67 @@ def analyse_blog():
         if not text:
             return jsonify({'error':'content field is required'}),400
 
-        categories=classifier.classify(text)
+        # Optional: latency budget in ms and/or quality tier for the summary
+        latency_budget_ms=data.get('latency_budget_ms')
+        quality=data.get('quality')
+        if quality is not None and quality not in QUALITY_TIERS:
+            return jsonify({'error':f'quality must be one of {list(QUALITY_TIERS)}'}),400
+        if latency_budget_ms is not None and (isinstance(latency_budget_ms,bool) or not isinstance(latency_budget_ms,(int,float)) or latency_budget_ms<=0):
+            return jsonify({'error':'latency_budget_ms must be a positive number'}),400
 
-        summary_result=summarizer.summarize(text)
-        summary=summary_result[0].get('summary_text')
+        # Results are only reused for requests with the same summary settings
+        kind=_blog_kind(latency_budget_ms, quality)
+        match=near_duplicates.lookup(text, kind)
+        if match:
+            return jsonify(_reuse(match, ['summary', 'classifications'])),200
 
-        return jsonify({
-            'success':True,
-            'summary':summary,
-            'classifications':categories
-        }),200
+        lane='summarize_long' if len(text) > LONG_DOCUMENT_CHARS else 'summarize_short'
+        result, shared = inflight.do(
+            request_key('blog', {
+                'content': text,
+                'latency_budget_ms': latency_budget_ms,
+                'quality': quality
+            }),
+            lambda: _admitted(lane, _analyse, text, latency_budget_ms, quality)
+        )
+        if not shared:
+            near_duplicates.add(text, kind, result, title=title)
+
+        return jsonify(result),200
 
+    except Overloaded as e:
+        return _overloaded(e)
     except Exception as e:
         return jsonify({'error':str(e)}),500
 
 
+def _blog_kind(latency_budget_ms=None, quality=None):
+    if latency_budget_ms is None and quality is None:
+        return 'blog'
+    return f'blog:quality={quality}:budget={latency_budget_ms}'
+
+
+def _analyse(text, latency_budget_ms=None, quality=None):
+    categories=classifier.classify(text)
+
+    if latency_budget_ms is None and quality is None:
+        summary_result=summarizer.summarize(text)
+    else:
+        summary_result=summarizer.summarize_with_budget(text, latency_budget_ms, quality)
+    summary=summary_result[0].get('summary_text')
+
+    result={
+        'success':True,
+        'summary':summary,
+        'classifications':categories
+    }
+    if 'profile' in summary_result[0]:
+        result['summary_profile']=summary_result[0]['profile']
+    if 'metadata' in summary_result[0]:
+        result['summary_metadata']=summary_result[0]['metadata']
+    return result
+
+
 
 @app.route('/api/keywords/extract', methods=['POST'])
 def extract_new_keywords():
@@ -93,41 +217,16 @@ def extract_new_keywords():
         confidence = data.get('confidence', 0.0)
         title = data.get('title', '')
         
-        # Extract keywords
-        result = keyword_extractor.extract_new_keywords(content, category, top_n=20)
-        
-        # Auto-add keywords if requested
-        added_keywords = []
-        if auto_add and result.get("new_keywords"):
-            # Filter by uniqueness score
-            keywords_to_add = [
-                kw["keyword"] for kw in result["new_keywords"]
-                if kw["uniqueness_score"] >= min_uniqueness_score and kw["is_unique"]
-            ]
-            
-            if keywords_to_add:
-                # Add to category
-                add_result = keyword_extractor.add_keywords_to_category(
-                    category, 
-                    keywords_to_add
-                )
-                added_keywords = add_result.get('added_keywords', [])
-                
-                # Save to labels.py
-                save_result = keyword_extractor.save_updated_categories(filepath="labels.py")
-                
-                # Reload CATEGORIES in memory
-                import importlib
-                import labels
-                importlib.reload(labels)
-                from labels import CATEGORIES as UPDATED_CATEGORIES
-                
-                result['keywords_added'] = {
-                    'count': len(added_keywords),
-                    'keywords': added_keywords,
-                    'total_keywords_now': len(UPDATED_CATEGORIES[category]),
-                    'saved_to_file': True
-                }
+        result, _ = inflight.do(
+            request_key('keywords/extract', {
+                'content': content,
+                'category': category,
+                'auto_add': auto_add,
+                'min_uniqueness_score': min_uniqueness_score
+            }),
+            lambda: _admitted('classify', _extract_keywords,
+                              content, category, auto_add, min_uniqueness_score)
+        )
         
         return jsonify({
             'success': True,
@@ -146,10 +245,52 @@ def extract_new_keywords():
             })
         }), 200
         
+    except Overloaded as e:
+        return _overloaded(e)
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
 
+def _extract_keywords(content, category, auto_add, min_uniqueness_score):
+    # Extract keywords
+    result = keyword_extractor.extract_new_keywords(content, category, top_n=20)
+    
+    # Auto-add keywords if requested
+    added_keywords = []
+    if auto_add and result.get("new_keywords"):
+        # Filter by uniqueness score
+        keywords_to_add = [
+            kw["keyword"] for kw in result["new_keywords"]
+            if kw["uniqueness_score"] >= min_uniqueness_score and kw["is_unique"]
+        ]
+        
+        if keywords_to_add:
+            # Add to category
+            add_result = keyword_extractor.add_keywords_to_category(
+                category, 
+                keywords_to_add
+            )
+            added_keywords = add_result.get('added_keywords', [])
+            
+            # Save to labels.py
+            save_result = keyword_extractor.save_updated_categories(filepath="labels.py")
+            
+            # Reload CATEGORIES in memory
+            import importlib
+            import labels
+            importlib.reload(labels)
+            from labels import CATEGORIES as UPDATED_CATEGORIES
+            
+            result['keywords_added'] = {
+                'count': len(added_keywords),
+                'keywords': added_keywords,
+                'total_keywords_now': len(UPDATED_CATEGORIES[category]),
+                'saved_to_file': True
+            }
+    
+    return result
+
+
 @app.route('/api/keywords/add', methods=['POST'])
 def add_keywords_manually():
     """
@@ -176,17 +317,20 @@ def add_keywords_manually():
         if category not in CATEGORIES:
             return jsonify({'error': f'Invalid category: {category}'}), 400
         
-        # Add keywords
-        add_result = keyword_extractor.add_keywords_to_category(category, keywords)
-        
-        # Save to labels.py
-        keyword_extractor.save_updated_categories(filepath="labels.py")
+        with admission.admit('classify'):
+            # Add keywords
+            add_result = keyword_extractor.add_keywords_to_category(category, keywords)
+            
+            # Save to labels.py
+            keyword_extractor.save_updated_categories(filepath="labels.py")
         
         return jsonify({
             'success': True,
             'result': add_result
         }), 200
         
+    except Overloaded as e:
+        return _overloaded(e)
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
@@ -202,25 +346,39 @@ def process_and_extract():
         text = data['text']
         auto_add = data.get('auto_add', False)
         
-        classifications = classifier.classify(text)
-        
-        if not classifications:
-            return jsonify({'error': 'No category classified'}), 400
+        # auto_add must run extraction for its side effect, so never reuse then
+        if not auto_add:
+            match = near_duplicates.lookup(text, 'process')
+            if match:
+                return jsonify(_reuse(match, ['classifications', 'keyword_extraction'])), 200
         
-        top_category = classifications[0]['category']
-        
-        keyword_result = extract_and_update_keywords(
-            text,
-            top_category,
-            auto_add=auto_add
-        )
+        with admission.admit('classify'):
+            classifications = classifier.classify(text)
+            
+            if not classifications:
+                return jsonify({'error': 'No category classified'}), 400
+            
+            top_category = classifications[0]['category']
+            
+            keyword_result = extract_and_update_keywords(
+                text,
+                top_category,
+                auto_add=auto_add,
+                extractor=keyword_extractor
+            )
         
-        return jsonify({
+        result = {
             'success': True,
             'classifications': classifications,
             'keyword_extraction': keyword_result
-        }), 200
+        }
+        if not auto_add:
+            near_duplicates.add(text, 'process', result)
+        
+        return jsonify(result), 200
         
+    except Overloaded as e:
+        return _overloaded(e)
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
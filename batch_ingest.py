@@ -0,0 +1,274 @@
+"""
+Offline bulk ingestion: classify, summarize and extract keywords for a corpus
+without going through the HTTP API.
+
+Input is either a directory of .txt/.md files (id = relative path) or a JSONL
+file with one {"id", "title", "content"} object per line ("text" is accepted
+in place of "content"; id defaults to the line number). Results are appended
+to the output JSONL, which doubles as the checkpoint: re-running the same
+command skips every id already written successfully, so interrupted runs
+resume. Documents whose record has an "error" field are processed again and
+a new record is appended; the last record for an id is the current one.
+
+    python batch_ingest.py archive/ results.jsonl --workers 4 --batch-size 16
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+# Models are loaded once per worker process by _init_worker
+_classifier = None
+_summarizer = None
+_keyword_extractor = None
+
+
+def iter_documents(source):
+    if os.path.isdir(source):
+        for root, _, files in os.walk(source):
+            for name in sorted(files):
+                if not name.endswith((".txt", ".md")):
+                    continue
+                path = os.path.join(root, name)
+                with open(path, "r", encoding="utf-8") as f:
+                    yield {
+                        "id": os.path.relpath(path, source),
+                        "title": os.path.splitext(name)[0],
+                        "content": f.read()
+                    }
+    else:
+        with open(source, "r", encoding="utf-8") as f:
+            for line_no, line in enumerate(f, 1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError as e:
+                    # Report the line instead of aborting the whole corpus
+                    yield {"id": str(line_no), "title": "", "content": "",
+                           "error": f"invalid JSON on line {line_no}: {str(e)}"}
+                    continue
+                yield {
+                    "id": str(record.get("id", line_no)),
+                    "title": record.get("title", ""),
+                    "content": record.get("content") or record.get("text") or ""
+                }
+
+
+def load_completed_ids(output_path):
+    """
+    Read ids already processed without error from the output file, dropping a
+    torn trailing line
+    """
+    completed = set()
+    if not os.path.exists(output_path):
+        return completed
+
+    with open(output_path, "rb+") as f:
+        data = f.read()
+        end = data.rfind(b"\n") + 1
+        if end < len(data):
+            # The last write was interrupted mid-line; discard it
+            f.truncate(end)
+        for line in data[:end].splitlines():
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            if "error" in record:
+                # Failed earlier: retry, unless a later record already succeeded
+                completed.discard(record["id"])
+            else:
+                completed.add(record["id"])
+    return completed
+
+
+def iter_batches(documents, batch_size, completed):
+    batch = []
+    for doc in documents:
+        if doc["id"] in completed:
+            continue
+        batch.append(doc)
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _init_worker(summarize, extract_keywords, torch_threads):
+    global _classifier, _summarizer, _keyword_extractor
+
+    if torch_threads:
+        import torch
+        torch.set_num_threads(torch_threads)
+
+    if extract_keywords:
+        from keyword_extractor import KeywordExtractor
+        _keyword_extractor = KeywordExtractor()
+    from classifier import TextClassifier
+    _classifier = TextClassifier(vocabulary=_keyword_extractor)
+    if summarize:
+        from summarizer import blogsummarizer
+        _summarizer = blogsummarizer()
+
+
+def process_batch(batch):
+    results = [{"id": doc["id"], "title": doc["title"], "timings_ms": {}} for doc in batch]
+    texts = [doc["content"] for doc in batch]
+    for doc, result in zip(batch, results):
+        if "error" in doc:
+            result["error"] = doc["error"]
+        elif not doc["content"].strip():
+            result["error"] = "empty content"
+    valid = [i for i, result in enumerate(results) if "error" not in result]
+
+    if not valid:
+        return results
+
+    # Batched model calls report the batch time split evenly across documents
+    start = time.perf_counter()
+    try:
+        classifications = _classifier.classify_batch([texts[i] for i in valid])
+        per_doc = (time.perf_counter() - start) * 1000 / len(valid)
+        for i, categories in zip(valid, classifications):
+            results[i]["classifications"] = categories
+            results[i]["timings_ms"]["classify"] = round(per_doc, 2)
+    except Exception as e:
+        print(f"Batch classification failed: {str(e)}, retrying one document at a time...")
+        for i in valid:
+            start = time.perf_counter()
+            try:
+                results[i]["classifications"] = _classifier.classify(texts[i])
+                results[i]["timings_ms"]["classify"] = round((time.perf_counter() - start) * 1000, 2)
+            except Exception as doc_error:
+                results[i]["error"] = f"classification failed: {str(doc_error)}"
+        # Unclassified documents skip the remaining steps
+        valid = [i for i in valid if "error" not in results[i]]
+        if not valid:
+            return results
+
+    if _summarizer is not None:
+        start = time.perf_counter()
+        try:
+            summaries = _summarizer.summarize_batch([texts[i] for i in valid])
+            per_doc = (time.perf_counter() - start) * 1000 / len(valid)
+            for i, summary in zip(valid, summaries):
+                results[i]["summary"] = summary[0].get("summary_text")
+                results[i]["timings_ms"]["summarize"] = round(per_doc, 2)
+        except Exception as e:
+            print(f"Batch summarization failed: {str(e)}, retrying one document at a time...")
+            # One bad document should only fail itself
+            for i in valid:
+                start = time.perf_counter()
+                try:
+                    results[i]["summary"] = _summarizer.summarize(texts[i])[0].get("summary_text")
+                    results[i]["timings_ms"]["summarize"] = round((time.perf_counter() - start) * 1000, 2)
+                except Exception as doc_error:
+                    results[i]["error"] = f"summarization failed: {str(doc_error)}"
+
+    if _keyword_extractor is not None:
+        for i in valid:
+            categories = results[i]["classifications"]
+            if not categories:
+                continue
+            top_category = max(categories, key=lambda c: c["confidence"])["category"]
+            start = time.perf_counter()
+            try:
+                keywords = _keyword_extractor.extract_new_keywords(texts[i], top_category)
+            except Exception as e:
+                results[i]["error"] = f"keyword extraction failed: {str(e)}"
+                continue
+            results[i]["keyword_extraction"] = keywords
+            results[i]["timings_ms"]["keywords"] = round((time.perf_counter() - start) * 1000, 2)
+
+    return results
+
+
+def _write_results(out, results):
+    for result in results:
+        out.write(json.dumps(result, ensure_ascii=False) + "\n")
+    out.flush()
+    os.fsync(out.fileno())
+
+
+def run(source, output_path, workers=1, batch_size=16, summarize=True,
+        extract_keywords=True, torch_threads=None, max_pending=None):
+    completed = load_completed_ids(output_path)
+    if completed:
+        print(f"Resuming: {len(completed)} documents already in {output_path}")
+
+    batches = iter_batches(iter_documents(source), batch_size, completed)
+    init_args = (summarize, extract_keywords, torch_threads)
+    processed = 0
+    start = time.time()
+
+    with open(output_path, "a", encoding="utf-8") as out:
+        if workers <= 0:
+            _init_worker(*init_args)
+            for batch in batches:
+                _write_results(out, process_batch(batch))
+                processed += len(batch)
+                print(f"Processed {processed} documents ({processed / (time.time() - start):.2f} docs/s)")
+            return processed
+
+        # Keep a bounded number of batches in flight so huge corpora are streamed
+        max_pending = max_pending or workers * 2
+        ctx = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=workers, mp_context=ctx,
+                                 initializer=_init_worker, initargs=init_args) as pool:
+            pending = set()
+            for batch in batches:
+                pending.add(pool.submit(process_batch, batch))
+                if len(pending) >= max_pending:
+                    done = next(as_completed(pending))
+                    pending.remove(done)
+                    processed += _drain(out, done, processed, start)
+            for done in as_completed(pending):
+                processed += _drain(out, done, processed, start)
+    return processed
+
+
+def _drain(out, future, processed, start):
+    results = future.result()
+    _write_results(out, results)
+    total = processed + len(results)
+    print(f"Processed {total} documents ({total / (time.time() - start):.2f} docs/s)")
+    return len(results)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bulk classify, summarize and extract keywords")
+    parser.add_argument("source", help="Directory of .txt/.md files or a JSONL corpus")
+    parser.add_argument("output", help="Output JSONL path (also used as the resume checkpoint)")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Worker processes, each loading its own models (0 = run in-process)")
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--torch-threads", type=int, default=None,
+                        help="Torch intra-op threads per worker")
+    parser.add_argument("--no-summary", action="store_true")
+    parser.add_argument("--no-keywords", action="store_true")
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.source):
+        print(f"Input not found: {args.source}")
+        return 1
+
+    processed = run(
+        args.source,
+        args.output,
+        workers=args.workers,
+        batch_size=args.batch_size,
+        summarize=not args.no_summary,
+        extract_keywords=not args.no_keywords,
+        torch_threads=args.torch_threads
+    )
+    print(f"Done: {processed} new documents written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,49 @@
+import os
+from types import MappingProxyType
+from keyword_index import KeywordIndex
+
+
+class CategorySnapshot:
+    """
+    Immutable view of the category vocabulary: keyword tuples and the
+    similarity index holding their normalized embeddings.
+
+    The index is the only copy of the embeddings, stored at the precision
+    given by EMBEDDING_PRECISION (float32, float16 or int8).
+
+    Updates never modify a snapshot; `with_keywords` returns a new one and
+    the owner swaps its reference. A reader that grabs `owner.snapshot` once
+    sees a consistent vocabulary for the whole request without locking.
+    """
+
+    __slots__ = ("keywords", "index", "version")
+
+    def __init__(self, keywords, index, version=0):
+        object.__setattr__(self, "keywords", MappingProxyType(dict(keywords)))
+        object.__setattr__(self, "index", index)
+        object.__setattr__(self, "version", version)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("CategorySnapshot is immutable")
+
+    @classmethod
+    def build(cls, categories, encode, precision=None):
+        """`encode` maps a list of keywords to an (n, dim) embedding array"""
+        precision = precision or os.getenv("EMBEDDING_PRECISION", "float32")
+        if precision == "float16":
+            print("EMBEDDING_PRECISION=float16 halves embedding memory but makes similarity "
+                  "scans several times slower on CPU; int8 saves more memory without the slowdown")
+        keywords = {category: tuple(kws) for category, kws in categories.items()}
+        embeddings = {category: encode(list(kws)) for category, kws in keywords.items()}
+        index = KeywordIndex.from_category_embeddings(embeddings, precision=precision)
+        return cls(keywords, index)
+
+    def with_keywords(self, category, new_keywords, new_embeddings):
+        """New snapshot with keywords (and their embeddings) appended to `category`"""
+        keywords = dict(self.keywords)
+        keywords[category] = keywords[category] + tuple(new_keywords)
+        index = self.index.with_added(category, new_embeddings)
+        return CategorySnapshot(keywords, index, self.version + 1)
+
+    def all_keywords(self):
+        return {k.lower() for kws in self.keywords.values() for k in kws}
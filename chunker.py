@@ -1,4 +1,5 @@
 import re
+import zlib
 from typing import List
 
 #using overlapping chunker to save context for summarization
@@ -42,6 +43,57 @@ def overlapping_chunk_by_sentences(
     return chunks
 
 
+
+def content_defined_chunk_by_sentences(
+    text: str,
+    max_chunk_size: int = 900,
+    min_chunk_size: int = 600,
+    overlap_sentences: int = 2,
+    anchor_every: int = 3
+) -> List[str]:
+    # Like overlapping_chunk_by_sentences, but once a chunk reaches
+    # min_chunk_size it ends at the first "anchor" sentence (picked by a hash
+    # of its content) instead of packing greedily up to max_chunk_size.
+    # Boundaries then depend on nearby content only, so an edit changes the
+    # chunks around it and later chunks keep the same text (and cache keys).
+    sentences = re.split(r'(?<=[.!?])\s+', text.strip())
+    sentences = [s for s in sentences if s.strip()]
+    
+    if not sentences:
+        return []
+    
+    def is_anchor(sentence):
+        return zlib.crc32(sentence.encode('utf-8')) % anchor_every == 0
+    
+    chunks = []
+    current_chunk = []
+    current_size = 0
+    new_sentences = 0
+    i = 0
+    
+    while i < len(sentences):
+        sentence = sentences[i]
+        sentence_length = len(sentence)
+        
+        if not new_sentences or current_size + sentence_length <= max_chunk_size:
+            current_chunk.append(sentence)
+            current_size += sentence_length + 1
+            new_sentences += 1
+            i += 1
+            if not (current_size >= min_chunk_size and is_anchor(sentence)) or i == len(sentences):
+                continue
+        
+        chunks.append(' '.join(current_chunk))
+        overlap_start = max(0, len(current_chunk) - overlap_sentences)
+        current_chunk = current_chunk[overlap_start:]
+        current_size = sum(len(s) + 1 for s in current_chunk)
+        new_sentences = 0
+    
+    if new_sentences:
+        chunks.append(' '.join(current_chunk))
+    
+    return chunks
+
 def simple_sentence_chunker(
     text: str,
     sentences_per_chunk: int = 5,
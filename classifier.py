@@ -1,37 +1,46 @@
 from sentence_transformers import SentenceTransformer
 
-from sklearn.metrics.pairwise import cosine_similarity
 import numpy as np
 from labels import CATEGORIES
+from category_snapshot import CategorySnapshot
 
 
 class TextClassifier:
-    def __init__(self, threshold=0.2):
+    def __init__(self, threshold=0.2, vocabulary=None):
         self.model=SentenceTransformer("all-MiniLM-L6-v2", device='cpu')
         self.threshold = threshold
-        self.category_embeddings = self._embed_categories()
+        # `vocabulary` is any owner of a CategorySnapshot (e.g. a KeywordExtractor);
+        # sharing it keeps one copy of the embeddings and sees its keyword updates
+        self.vocabulary = vocabulary
+        if vocabulary is None:
+            self._snapshot = CategorySnapshot.build(CATEGORIES, self._encode)
         
-    def _embed_categories(self):
-        embeddings={}
-        for category, keywords in CATEGORIES.items():
-            emb_list = [self.model.encode(keyword, show_progress_bar=False) for keyword in keywords]
-            embeddings[category]=np.array(emb_list)
-        return embeddings
+    def _encode(self, keywords):
+        emb_list = [self.model.encode(keyword, show_progress_bar=False) for keyword in keywords]
+        return np.array(emb_list)
+
+    @property
+    def snapshot(self):
+        if self.vocabulary is not None:
+            return self.vocabulary.snapshot
+        return self._snapshot
+
     
     def classify(self, text:str):
         text_embedding= self.model.encode(text, show_progress_bar=False)
-        text_embedding=np.array(text_embedding).reshape(1,-1)
+        return self._score(text_embedding)
+
+    def classify_batch(self, texts, batch_size=32):
+        text_embeddings= self.model.encode(texts, batch_size=batch_size, show_progress_bar=False)
+        return [self._score(embedding) for embedding in text_embeddings]
+
+    def _score(self, text_embedding):
         results=[]
         
-        for category, embeddings in self.category_embeddings.items():
-            scores=cosine_similarity(text_embedding, embeddings)[0]
-            confidence=float(np.max(scores))
+        for category, confidence in self.snapshot.index.max_per_category(text_embedding).items():
             if confidence>= self.threshold:
                 results.append({
                     "category":category,
                     "confidence": round(confidence,3)
                     })
         return results
-            
- 
- 
\ No newline at end of file
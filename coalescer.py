@@ -0,0 +1,67 @@
+import hashlib
+import json
+import threading
+
+
+def request_key(endpoint, params):
+    """Stable hash of an endpoint name plus its (JSON-serializable) parameters"""
+    payload = json.dumps({"endpoint": endpoint, "params": params}, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Deduplicates concurrent identical work. The first caller for a key runs
+    the function; callers arriving while it is in flight wait and receive the
+    same result (or exception). Nothing is cached once the call finishes.
+    Results are shared between callers and must not be mutated.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.stats = {"calls": 0, "executions": 0, "coalesced": 0, "in_flight": 0}
+
+    def do(self, key, fn):
+        """Returns (result, shared) where shared is True for coalesced callers"""
+        with self._lock:
+            self.stats["calls"] += 1
+            call = self._calls.get(key)
+            if call is not None:
+                self.stats["coalesced"] += 1
+                leader = False
+            else:
+                call = _Call()
+                self._calls[key] = call
+                self.stats["executions"] += 1
+                self.stats["in_flight"] = len(self._calls)
+                leader = True
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = fn()
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+                self.stats["in_flight"] = len(self._calls)
+            call.done.set()
+        return call.result, False
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self.stats)
@@ -0,0 +1,220 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+import requests
+from requests.adapters import HTTPAdapter
+
+DEFAULT_BASE_URL = "https://generativelanguage.googleapis.com"
+
+
+class GeminiError(Exception):
+    def __init__(self, message, retryable=True, status=None):
+        super().__init__(message)
+        self.retryable = retryable
+        self.status = status
+
+
+class GeminiUnavailable(GeminiError):
+    """Raised without calling upstream: breaker open or no capacity left"""
+    pass
+
+
+class CircuitBreaker:
+    """
+    Opens after `failure_threshold` consecutive failures and rejects calls
+    for `reset_timeout` seconds. After that a single trial call is let
+    through (half-open); its outcome closes or re-opens the breaker. A
+    trial that never reports back within `reset_timeout` is replaced by a
+    new one.
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self.trial_at = 0.0
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            if self.state == "closed":
+                return True
+            now = time.monotonic()
+            if self.state == "open" and now - self.opened_at >= self.reset_timeout:
+                self.state = "half_open"
+                self.trial_at = now
+                return True
+            if self.state == "half_open" and now - self.trial_at >= self.reset_timeout:
+                self.trial_at = now
+                return True
+            return False
+
+    def release_trial(self):
+        """The half-open trial never reached upstream: re-open and wait again"""
+        with self._lock:
+            if self.state == "half_open":
+                self.state = "open"
+                self.opened_at = time.monotonic()
+
+    def record_success(self):
+        with self._lock:
+            self.state = "closed"
+            self.failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == "half_open" or self.failures >= self.failure_threshold:
+                self.state = "open"
+                self.opened_at = time.monotonic()
+
+
+class GeminiClient:
+    """
+    Thin REST client for Gemini generateContent.
+
+    - connection reuse through one pooled requests.Session
+    - every call has a deadline covering all attempts
+    - at most `max_concurrency` requests in flight per process
+    - hedging: if the first attempt has not answered after `hedge_delay`
+      seconds a second one is sent and the first response wins; attempts
+      that fail with a retryable error are retried straight away
+    - a circuit breaker that fails fast while upstream is unhealthy, so
+      callers can drop to the local model instead of waiting
+
+    `base_url` can point at a local stub server for testing.
+    """
+
+    RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+    def __init__(self, api_key, model="gemini-3-flash-preview", base_url=DEFAULT_BASE_URL,
+                 timeout=20.0, max_concurrency=4, max_attempts=2, hedge_delay=3.0,
+                 breaker=None):
+        self.api_key = api_key
+        self.model = model
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.max_attempts = max_attempts
+        self.hedge_delay = hedge_delay
+        self.breaker = breaker or CircuitBreaker()
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_concurrency)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency * max_attempts,
+                                            thread_name_prefix="gemini")
+        self._stats_lock = threading.Lock()
+        self.stats = {
+            "calls": 0,
+            "successes": 0,
+            "failures": 0,
+            "hedged": 0,
+            "retried": 0,
+            "short_circuited": 0,
+        }
+
+    def _count(self, key):
+        with self._stats_lock:
+            self.stats[key] += 1
+
+    def _request(self, prompt, deadline):
+        try:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise GeminiError("Deadline exceeded", retryable=False)
+            response = self.session.post(
+                f"{self.base_url}/v1beta/models/{self.model}:generateContent",
+                headers={"x-goog-api-key": self.api_key},
+                json={"contents": [{"parts": [{"text": prompt}]}]},
+                timeout=remaining
+            )
+        except requests.RequestException as e:
+            raise GeminiError(f"Gemini request failed: {str(e)}") from e
+        finally:
+            self._slots.release()
+
+        if response.status_code != 200:
+            raise GeminiError(
+                f"Gemini returned HTTP {response.status_code}: {response.text[:200]}",
+                retryable=response.status_code in self.RETRYABLE_STATUS,
+                status=response.status_code
+            )
+
+        try:
+            parts = response.json()["candidates"][0]["content"]["parts"]
+            return "".join(part.get("text", "") for part in parts)
+        except (ValueError, KeyError, IndexError) as e:
+            raise GeminiError(f"Unexpected Gemini response: {response.text[:200]}") from e
+
+    def _launch(self, prompt, deadline, block):
+        timeout = max(0.0, deadline - time.monotonic()) if block else 0
+        if not self._slots.acquire(timeout=timeout):
+            return None
+        return self._executor.submit(self._request, prompt, deadline)
+
+    def generate(self, prompt, timeout=None):
+        if not self.breaker.allow():
+            self._count("short_circuited")
+            raise GeminiUnavailable("Gemini circuit breaker is open", retryable=False)
+
+        self._count("calls")
+        deadline = time.monotonic() + (timeout or self.timeout)
+
+        first = self._launch(prompt, deadline, block=True)
+        if first is None:
+            # No upstream outcome to report; don't leave the breaker half-open
+            self.breaker.release_trial()
+            self._count("short_circuited")
+            raise GeminiUnavailable("No Gemini capacity available before the deadline", retryable=False)
+
+        pending = {first}
+        attempts = 1
+        last_error = None
+        while pending:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            wait_for = min(self.hedge_delay, remaining) if attempts < self.max_attempts else remaining
+            done, pending = wait(pending, timeout=wait_for, return_when=FIRST_COMPLETED)
+
+            retry = False
+            for future in done:
+                try:
+                    text = future.result()
+                except GeminiError as e:
+                    last_error = e
+                    retry = retry or e.retryable
+                    continue
+                self.breaker.record_success()
+                self._count("successes")
+                return text
+
+            if attempts < self.max_attempts and (not done or retry):
+                # Nothing back yet: hedge. Retryable failure: retry. Neither
+                # is allowed to queue behind other callers for a slot.
+                extra = self._launch(prompt, deadline, block=False)
+                if extra is not None:
+                    pending.add(extra)
+                    attempts += 1
+                    self._count("retried" if done else "hedged")
+
+        self._count("failures")
+        if last_error is not None and not pending:
+            if last_error.status is not None and not last_error.retryable:
+                # Upstream answered and rejected this request (bad or oversized
+                # prompt); that says nothing about its health
+                self.breaker.record_success()
+            else:
+                self.breaker.record_failure()
+            raise last_error
+        self.breaker.record_failure()
+        raise GeminiError("Gemini call exceeded its deadline", retryable=False)
+
+    def close(self):
+        self._executor.shutdown(wait=False)
+        self.session.close()
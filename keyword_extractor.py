@@ -1,8 +1,8 @@
 from sentence_transformers import SentenceTransformer
-from sklearn.metrics.pairwise import cosine_similarity
-import numpy as np
 from labels import CATEGORIES
+from category_snapshot import CategorySnapshot
 import re
+import threading
 from collections import Counter
 import nltk
 from nltk.corpus import stopwords
@@ -20,16 +20,18 @@ class KeywordExtractor:
         self.model._modules['0'].auto_model.config.use_cache = False
         self.similarity_threshold = similarity_threshold
         self.uniqueness_threshold = uniqueness_threshold
-        self.categories = CATEGORIES.copy()
-        self.category_embeddings = self._embed_all_categories()
+        # Readers take self.snapshot once per call; writers build a new
+        # snapshot under _write_lock and swap the reference
+        self.snapshot = CategorySnapshot.build(CATEGORIES, self._encode)
+        self._write_lock = threading.Lock()
         self.stopwords = set(stopwords.words('english'))
         
-    def _embed_all_categories(self):
-        embeddings = {}
-        for category, keywords in self.categories.items():
-            keyword_embeddings = self.model.encode(keywords, show_progress_bar=False)
-            embeddings[category] = keyword_embeddings
-        return embeddings
+    def _encode(self, keywords):
+        return self.model.encode(keywords, show_progress_bar=False)
+    
+    @property
+    def categories(self):
+        return self.snapshot.keywords
     
     def _preprocess_text(self, text):
         text = text.lower()
@@ -57,18 +59,19 @@ class KeywordExtractor:
         most_common = ngram_freq.most_common(top_n)
         return [ngram for ngram, freq in most_common]
     
-    def _check_uniqueness_to_category(self, keyword, target_category):
-        keyword_embedding = self.model.encode([keyword], show_progress_bar=False)
-        
-        target_embeddings = self.category_embeddings[target_category]
-        target_similarities = cosine_similarity(keyword_embedding, target_embeddings)[0]
-        max_target_sim = np.max(target_similarities)
-        
-        other_max_similarities = []
-        for category, embeddings in self.category_embeddings.items():
-            if category != target_category:
-                similarities = cosine_similarity(keyword_embedding, embeddings)[0]
-                other_max_similarities.append(np.max(similarities))
+    def _check_uniqueness_to_category(self, keyword, target_category, keyword_embedding=None,
+                                      snapshot=None):
+        snapshot = snapshot or self.snapshot
+        if keyword_embedding is None:
+            keyword_embedding = self.model.encode([keyword], show_progress_bar=False)[0]
+        
+        max_similarities = snapshot.index.max_per_category(keyword_embedding)
+        max_target_sim = max_similarities[target_category]
+        
+        other_max_similarities = [
+            sim for category, sim in max_similarities.items()
+            if category != target_category
+        ]
         
         if not other_max_similarities:
             return True, max_target_sim, 0.0
@@ -79,7 +82,8 @@ class KeywordExtractor:
         return is_unique, max_target_sim, max_other_sim
     
     def extract_new_keywords(self, text, assigned_category, top_n=20):
-        if assigned_category not in self.categories:
+        snapshot = self.snapshot
+        if assigned_category not in snapshot.keywords:
             return {
                 "error": f"Category '{assigned_category}' not found",
                 "new_keywords": []
@@ -91,18 +95,17 @@ class KeywordExtractor:
         
         candidates = list(set(candidate_words + bigrams + trigrams))
         
-        existing_keywords = set()
-        for keywords in self.categories.values():
-            existing_keywords.update([k.lower() for k in keywords])
+        existing_keywords = snapshot.all_keywords()
+        
+        candidates_to_check = [c for c in candidates if c.lower() not in existing_keywords]
+        # Encode all candidates in one batch instead of one model call each
+        candidate_embeddings = self.model.encode(candidates_to_check, show_progress_bar=False)
         
         new_keywords = []
         
-        for candidate in candidates:
-            if candidate.lower() in existing_keywords:
-                continue
-            
+        for candidate, embedding in zip(candidates_to_check, candidate_embeddings):
             is_unique, target_sim, other_sim = self._check_uniqueness_to_category(
-                candidate, assigned_category
+                candidate, assigned_category, keyword_embedding=embedding, snapshot=snapshot
             )
             
             if target_sim >= self.similarity_threshold:
@@ -125,30 +128,35 @@ class KeywordExtractor:
         }
     
     def add_keywords_to_category(self, category, keywords_list):
-        if category not in self.categories:
-            return {"error": f"Category '{category}' not found"}
-        
-        added_keywords = []
-        for keyword in keywords_list:
-            if keyword not in self.categories[category]:
-                self.categories[category].append(keyword)
-                added_keywords.append(keyword)
-        
-        self.category_embeddings = self._embed_all_categories()
+        with self._write_lock:
+            snapshot = self.snapshot
+            if category not in snapshot.keywords:
+                return {"error": f"Category '{category}' not found"}
+            
+            added_keywords = []
+            for keyword in keywords_list:
+                if keyword not in snapshot.keywords[category] and keyword not in added_keywords:
+                    added_keywords.append(keyword)
+            
+            # Only embed the new keywords; readers keep the old snapshot until the swap
+            if added_keywords:
+                new_embeddings = self._encode(added_keywords)
+                snapshot = snapshot.with_keywords(category, added_keywords, new_embeddings)
+                self.snapshot = snapshot
         
         return {
             "category": category,
             "added_keywords": added_keywords,
-            "total_keywords_now": len(self.categories[category])
+            "total_keywords_now": len(snapshot.keywords[category])
         }
     
     def save_updated_categories(self, filepath="labels_updated.py"):
         """Save updated categories back to labels.py file"""
-        with open(filepath, 'w', encoding='utf-8') as f:
+        with self._write_lock, open(filepath, 'w', encoding='utf-8') as f:
             f.write("# Auto-generated categories file\n")
             f.write("# Last updated by KeywordExtractor\n\n")
             f.write("CATEGORIES = {\n")
-            for category, keywords in self.categories.items():
+            for category, keywords in self.snapshot.keywords.items():
                 f.write(f'    "{category}": [\n')
                 for keyword in keywords:
                     # Escape quotes in keywords
@@ -161,8 +169,10 @@ class KeywordExtractor:
 
 
 def extract_and_update_keywords(text, assigned_category, auto_add=False, 
-                                min_uniqueness_score=0.2):
-    extractor = KeywordExtractor(
+                                min_uniqueness_score=0.2, extractor=None):
+    # Pass a long-lived extractor to skip loading the model and embedding
+    # every category on each call, and to keep auto-added keywords
+    extractor = extractor or KeywordExtractor(
         similarity_threshold=0.4,
         uniqueness_threshold=0.2
     )
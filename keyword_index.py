@@ -0,0 +1,484 @@
+import time
+import numpy as np
+
+
+def _normalize(vectors):
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if vectors.ndim == 1:
+        vectors = vectors.reshape(1, -1)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+PRECISIONS = ("float32", "float16", "int8")
+
+# Compact rows are widened to float32 and scored this many at a time. int8
+# widening is cheap, so small cache-resident blocks win; numpy widens
+# float16 in software and amortizes that better over larger blocks
+_SCAN_BLOCK = {"float16": 4096, "int8": 256}
+
+
+def _quantize(vectors, precision):
+    """Storage form of normalized rows; int8 rows come with a float32 scale each"""
+    if precision == "int8":
+        scales = np.abs(vectors).max(axis=1) / 127.0
+        scales[scales == 0] = 1.0
+        return np.round(vectors / scales[:, None]).astype(np.int8), scales.astype(np.float32)
+    return vectors.astype(precision, copy=False), None
+
+
+class _InvertedList:
+    """
+    Growable contiguous block of normalized vectors stored as float32,
+    float16, or int8 with a per-row scale
+    """
+
+    def __init__(self, dim, capacity=16, precision="float32"):
+        self.precision = precision
+        self.vectors = np.empty((capacity, dim), dtype=precision)
+        self.scales = np.empty(capacity, dtype=np.float32) if precision == "int8" else None
+        self.size = 0
+
+    def _grow(self, needed):
+        capacity = max(needed, 2 * len(self.vectors))
+        grown = np.empty((capacity, self.vectors.shape[1]), dtype=self.vectors.dtype)
+        grown[:self.size] = self.vectors[:self.size]
+        self.vectors = grown
+        if self.scales is not None:
+            scales = np.empty(capacity, dtype=np.float32)
+            scales[:self.size] = self.scales[:self.size]
+            self.scales = scales
+
+    def append(self, vectors):
+        stored, scales = _quantize(vectors, self.precision)
+        needed = self.size + len(stored)
+        if needed > len(self.vectors):
+            self._grow(needed)
+        self.vectors[self.size:needed] = stored
+        if scales is not None:
+            self.scales[self.size:needed] = scales
+        self.size = needed
+
+    def view(self):
+        """Stored rows as float32 (a dequantized copy for compact precisions)"""
+        rows = self.vectors[:self.size]
+        if self.precision == "float32":
+            return rows
+        rows = rows.astype(np.float32)
+        if self.scales is not None:
+            rows *= self.scales[:self.size, None]
+        return rows
+
+    def max_score(self, query):
+        """Max dot product with `query`, computed on the stored form"""
+        if self.precision == "float32":
+            return float(np.max(self.vectors[:self.size] @ query))
+
+        block = _SCAN_BLOCK[self.precision]
+        best = -np.inf
+        for start in range(0, self.size, block):
+            end = min(start + block, self.size)
+            scores = self.vectors[start:end].astype(np.float32) @ query
+            if self.scales is not None:
+                # q . (s * v) == s * (q . v), so scales apply to the scores
+                scores *= self.scales[start:end]
+            best = max(best, float(scores.max()))
+        return best
+
+    @property
+    def nbytes(self):
+        """Bytes allocated, including spare capacity"""
+        nbytes = self.vectors.nbytes
+        if self.scales is not None:
+            nbytes += self.scales.nbytes
+        return nbytes
+
+    @property
+    def scan_bytes(self):
+        """Bytes read by a full scan of this list"""
+        nbytes = self.vectors[:self.size].nbytes
+        if self.scales is not None:
+            nbytes += self.scales[:self.size].nbytes
+        return nbytes
+
+    def copy(self, extra=0):
+        """Copy with room for exactly `extra` more rows"""
+        clone = _InvertedList(self.vectors.shape[1], max(16, self.size + extra), self.precision)
+        clone.vectors[:self.size] = self.vectors[:self.size]
+        if self.scales is not None:
+            clone.scales[:self.size] = self.scales[:self.size]
+        clone.size = self.size
+        return clone
+
+
+class _CategoryIVF:
+    """
+    Inverted file over one category's keywords. Starts as a single list
+    (exact scan) and is clustered with spherical k-means into ~sqrt(n)
+    lists once it grows past `exact_threshold`.
+    """
+
+    def __init__(self, dim, exact_threshold, retrain_growth, kmeans_iters, rng,
+                 precision="float32"):
+        self.dim = dim
+        self.precision = precision
+        self.exact_threshold = exact_threshold
+        self.retrain_growth = retrain_growth
+        self.kmeans_iters = kmeans_iters
+        self.rng = rng
+        self.centroids = None
+        self.lists = [_InvertedList(dim, precision=precision)]
+        self.size = 0
+        self._trained_size = 0
+
+    def copy(self, incoming=None):
+        """
+        Copy whose lists have room for the normalized `incoming` vectors they
+        will receive, so a copy-on-write insert doesn't double their capacity
+        """
+        extra = np.zeros(len(self.lists), dtype=np.int64)
+        if incoming is not None and len(incoming):
+            if self.centroids is None:
+                extra[0] = len(incoming)
+            else:
+                assignments = np.argmax(incoming @ self.centroids.T, axis=1)
+                extra = np.bincount(assignments, minlength=len(self.lists))
+        clone = _CategoryIVF(self.dim, self.exact_threshold, self.retrain_growth,
+                             self.kmeans_iters, self.rng, self.precision)
+        clone.centroids = self.centroids
+        clone.lists = [lst.copy(int(n)) for lst, n in zip(self.lists, extra)]
+        clone.size = self.size
+        clone._trained_size = self._trained_size
+        return clone
+
+    def add(self, vectors):
+        self._insert(vectors)
+        self.size += len(vectors)
+
+        if self.centroids is None:
+            if self.size >= self.exact_threshold:
+                self._train()
+        elif self.size >= self._trained_size * self.retrain_growth:
+            self._train()
+
+    def _insert(self, vectors):
+        if self.centroids is None:
+            self.lists[0].append(vectors)
+            return
+        assignments = np.argmax(vectors @ self.centroids.T, axis=1)
+        for list_id in np.unique(assignments):
+            self.lists[list_id].append(vectors[assignments == list_id])
+
+    def all_vectors(self):
+        return np.vstack([lst.view() for lst in self.lists])
+
+    @property
+    def nbytes(self):
+        centroid_bytes = self.centroids.nbytes if self.centroids is not None else 0
+        return centroid_bytes + sum(lst.nbytes for lst in self.lists)
+
+    @property
+    def scan_bytes(self):
+        return sum(lst.scan_bytes for lst in self.lists)
+
+    def _train(self):
+        vectors = self.all_vectors()
+        nlist = max(1, int(np.sqrt(len(vectors))))
+
+        # Fit on a sample; the full set is assigned afterwards
+        sample_size = min(len(vectors), nlist * 64)
+        sample = vectors[self.rng.choice(len(vectors), sample_size, replace=False)]
+        centroids = sample[self.rng.choice(sample_size, nlist, replace=False)].copy()
+
+        for _ in range(self.kmeans_iters):
+            assignments = np.argmax(sample @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assignments, sample)
+            empty = np.bincount(assignments, minlength=nlist) == 0
+            # Re-seed empty clusters from random sample points
+            sums[empty] = sample[self.rng.choice(sample_size, int(empty.sum()))]
+            centroids = _normalize(sums)
+
+        self.centroids = centroids
+        self.lists = [_InvertedList(self.dim, precision=self.precision) for _ in range(nlist)]
+        self._insert(vectors)
+        self._trained_size = len(vectors)
+
+    def max_similarity(self, query, nprobe, exact=False):
+        if self.size == 0:
+            return -np.inf
+        if exact or self.centroids is None:
+            probe = self.lists
+        else:
+            nprobe = min(nprobe, len(self.lists))
+            centroid_scores = self.centroids @ query
+            top = np.argpartition(-centroid_scores, nprobe - 1)[:nprobe]
+            probe = [self.lists[i] for i in top]
+
+        best = -np.inf
+        for lst in probe:
+            if lst.size:
+                best = max(best, lst.max_score(query))
+        return best
+
+
+class KeywordIndex:
+    """
+    Approximate nearest-neighbour index over normalized keyword embeddings,
+    answering "max cosine similarity per category" queries.
+
+    Each category keeps its own IVF (inverted file). Below `exact_threshold`
+    keywords a category is a single list and queries are an exact scan; past
+    that it is clustered into ~sqrt(n) lists and only the `nprobe` lists with
+    the closest centroids are scanned, so query cost grows with sqrt(n)
+    instead of n. Inserts are incremental and a category is re-clustered
+    whenever it has grown by `retrain_growth` since its last fit.
+
+    `precision` sets how vectors are stored and scanned: "float32", "float16"
+    (half the bytes) or "int8" with one float32 scale per row (about a
+    quarter). Queries and centroids stay float32. numpy widens float16 in
+    software, so float16 scans are several times slower than float32; int8
+    scans are not.
+    """
+
+    def __init__(self, dim, exact_threshold=4096, nprobe=8,
+                 retrain_growth=2.0, kmeans_iters=10, seed=0, precision="float32"):
+        if precision not in PRECISIONS:
+            raise ValueError(f"precision must be one of {PRECISIONS}, got {precision!r}")
+        self.dim = dim
+        self.precision = precision
+        self.exact_threshold = exact_threshold
+        self.nprobe = nprobe
+        self.retrain_growth = retrain_growth
+        self.kmeans_iters = kmeans_iters
+        self.rng = np.random.default_rng(seed)
+        self.categories = {}
+
+    @classmethod
+    def from_category_embeddings(cls, category_embeddings, **kwargs):
+        dim = None
+        for embeddings in category_embeddings.values():
+            if len(embeddings):
+                dim = np.asarray(embeddings).shape[-1]
+                break
+        if dim is None:
+            raise ValueError("Cannot build an index from empty embeddings")
+
+        index = cls(dim, **kwargs)
+        for category, embeddings in category_embeddings.items():
+            index.add(category, embeddings)
+        return index
+
+    def __len__(self):
+        return sum(ivf.size for ivf in self.categories.values())
+
+    @property
+    def nbytes(self):
+        """Bytes allocated for vectors, scales and centroids, including spare capacity"""
+        return sum(ivf.nbytes for ivf in self.categories.values())
+
+    @property
+    def scan_bytes(self):
+        """Bytes read by an exact scan of every category"""
+        return sum(ivf.scan_bytes for ivf in self.categories.values())
+
+    def add(self, category, embeddings):
+        """Insert keyword embeddings for one category"""
+        if category not in self.categories:
+            self.categories[category] = _CategoryIVF(
+                self.dim, self.exact_threshold, self.retrain_growth,
+                self.kmeans_iters, self.rng, self.precision
+            )
+        vectors = _normalize(embeddings)
+        if vectors.size == 0:
+            return
+        if vectors.shape[1] != self.dim:
+            raise ValueError(f"Expected embeddings of dim {self.dim}, got {vectors.shape[1]}")
+        self.categories[category].add(vectors)
+
+    def with_added(self, category, embeddings):
+        """
+        Copy-on-write insert: returns a new index containing the extra
+        keywords and leaves this one untouched. Only the target category's
+        lists are copied; the other categories are shared.
+        """
+        clone = KeywordIndex(self.dim, self.exact_threshold, self.nprobe,
+                             self.retrain_growth, self.kmeans_iters, precision=self.precision)
+        clone.rng = self.rng
+        clone.categories = dict(self.categories)
+        if category in clone.categories:
+            clone.categories[category] = clone.categories[category].copy(_normalize(embeddings))
+        clone.add(category, embeddings)
+        return clone
+
+    def max_per_category(self, query, exact=False):
+        """Max cosine similarity of `query` against each category's keywords"""
+        query = _normalize(query)[0]
+        return {
+            category: ivf.max_similarity(query, self.nprobe, exact=exact)
+            for category, ivf in self.categories.items()
+        }
+
+    def search(self, queries, exact=False):
+        """
+        Returns a (n_queries, n_categories) array of per-category max cosine
+        similarities, columns ordered as `self.categories`.
+        """
+        queries = _normalize(queries)
+        results = np.empty((len(queries), len(self.categories)), dtype=np.float32)
+        for row, query in enumerate(queries):
+            for col, ivf in enumerate(self.categories.values()):
+                results[row, col] = ivf.max_similarity(query, self.nprobe, exact=exact)
+        return results
+
+
+def benchmark(index, queries, nprobes=(1, 2, 4, 8, 16, 32), atol=1e-5):
+    """
+    Recall-vs-latency sweep of the ANN path against exact search.
+
+    recall: fraction of (query, category) pairs whose approximate max equals
+    the exact one. top1_agreement: fraction of queries whose best category is
+    unchanged. max_abs_error: worst under-estimate of a category max.
+    """
+    queries = _normalize(queries)
+
+    start = time.perf_counter()
+    exact = index.search(queries, exact=True)
+    exact_ms = (time.perf_counter() - start) * 1000 / len(queries)
+
+    original_nprobe = index.nprobe
+    rows = []
+    try:
+        for nprobe in nprobes:
+            index.nprobe = nprobe
+            start = time.perf_counter()
+            approx = index.search(queries)
+            approx_ms = (time.perf_counter() - start) * 1000 / len(queries)
+            rows.append({
+                "nprobe": nprobe,
+                "recall": round(float(np.mean(np.abs(approx - exact) <= atol)), 4),
+                "top1_agreement": round(float(np.mean(
+                    np.argmax(approx, axis=1) == np.argmax(exact, axis=1))), 4),
+                "max_abs_error": round(float(np.max(exact - approx)), 4),
+                "ms_per_query": round(approx_ms, 3),
+            })
+    finally:
+        index.nprobe = original_nprobe
+
+    return {
+        "size": len(index),
+        "exact_ms_per_query": round(exact_ms, 3),
+        "results": rows,
+    }
+
+
+def _uniqueness_decisions(scores, uniqueness_threshold):
+    """is_unique for every (query, target category) pair, as KeywordExtractor decides it"""
+    decisions = np.empty(scores.shape, dtype=bool)
+    for target in range(scores.shape[1]):
+        others = np.delete(scores, target, axis=1)
+        other_max = others.max(axis=1) if others.shape[1] else np.full(len(scores), -np.inf)
+        decisions[:, target] = scores[:, target] > other_max + uniqueness_threshold
+    return decisions
+
+
+def precision_agreement(category_embeddings, queries, precisions=("float16", "int8"),
+                        threshold=0.2, uniqueness_threshold=0.2, **kwargs):
+    """
+    Compares compact storage against float32 on the decisions the app makes.
+
+    classification_agreement: fraction of queries whose category set at
+    `threshold` (TextClassifier) is unchanged. top1_agreement: fraction whose
+    best category is unchanged. uniqueness_agreement: fraction of (query,
+    target category) pairs whose is_unique verdict (KeywordExtractor) is
+    unchanged. bytes is allocated memory; scan_bytes is what one exact scan
+    reads. Scans are exact so only storage error is measured.
+    """
+    queries = _normalize(queries)
+
+    def measure(precision):
+        index = KeywordIndex.from_category_embeddings(category_embeddings, precision=precision, **kwargs)
+        start = time.perf_counter()
+        scores = index.search(queries, exact=True)
+        ms = (time.perf_counter() - start) * 1000 / len(queries)
+        return index, scores, ms
+
+    base_index, base, base_ms = measure("float32")
+    base_sets = base >= threshold
+    base_unique = _uniqueness_decisions(base, uniqueness_threshold)
+
+    rows = [{
+        "precision": "float32",
+        "bytes": base_index.nbytes,
+        "scan_bytes": base_index.scan_bytes,
+        "compression": 1.0,
+        "ms_per_query": round(base_ms, 3),
+    }]
+    for precision in precisions:
+        index, scores, ms = measure(precision)
+        rows.append({
+            "precision": precision,
+            "bytes": index.nbytes,
+            "scan_bytes": index.scan_bytes,
+            "compression": round(base_index.nbytes / index.nbytes, 2),
+            "ms_per_query": round(ms, 3),
+            "classification_agreement": round(float(np.mean(
+                np.all((scores >= threshold) == base_sets, axis=1))), 4),
+            "top1_agreement": round(float(np.mean(
+                np.argmax(scores, axis=1) == np.argmax(base, axis=1))), 4),
+            "uniqueness_agreement": round(float(np.mean(
+                _uniqueness_decisions(scores, uniqueness_threshold) == base_unique)), 4),
+            "max_abs_error": round(float(np.max(np.abs(scores - base))), 5),
+        })
+    return {"size": len(base_index), "queries": len(queries), "results": rows}
+
+
+if __name__ == "__main__":
+    # Synthetic benchmark: topic-clustered 384-d vectors (all-MiniLM-L6-v2 size)
+    rng = np.random.default_rng(0)
+    dim, n, n_topics, noise = 384, 100_000, 400, 0.03
+    topics = _normalize(rng.normal(size=(n_topics, dim)))
+    categories = ["Technology", "Healthcare", "Finance", "Education"]
+
+    index = KeywordIndex(dim)
+    batches = {category: [] for category in categories}
+    add_start = time.perf_counter()
+    for _ in range(0, n, 5000):
+        topic_ids = rng.integers(0, n_topics, size=5000)
+        vectors = topics[topic_ids] + noise * rng.normal(size=(5000, dim))
+        for i, category in enumerate(categories):
+            batch = vectors[topic_ids % len(categories) == i]
+            batches[category].append(batch)
+            index.add(category, batch)
+    print(f"Inserted {len(index)} vectors in {time.perf_counter() - add_start:.2f}s")
+
+    queries = topics[rng.integers(0, n_topics, size=200)] + noise * rng.normal(size=(200, dim))
+    report = benchmark(index, queries)
+    print(f"Exact search: {report['exact_ms_per_query']} ms/query")
+    for row in report["results"]:
+        print(f"nprobe={row['nprobe']:>3}  recall={row['recall']:.4f}  "
+              f"top1={row['top1_agreement']:.4f}  max_err={row['max_abs_error']:.4f}  "
+              f"{row['ms_per_query']} ms/query")
+
+    # Storage precision at a few vocabulary sizes. Queries mix two topics so
+    # category scores spread across the classification and uniqueness thresholds
+    embeddings = {category: np.vstack(batch) for category, batch in batches.items()}
+    mixed = (topics[rng.integers(0, n_topics, size=500)] * rng.uniform(0.2, 1.0, size=(500, 1))
+             + topics[rng.integers(0, n_topics, size=500)] * rng.uniform(0.2, 1.0, size=(500, 1))
+             + 0.05 * rng.normal(size=(500, dim)))
+    for size in (1_000, 10_000, n):
+        per_category = size // len(categories)
+        subset = {category: vectors[:per_category] for category, vectors in embeddings.items()}
+        report = precision_agreement(subset, mixed)
+        print(f"\n{report['size']} keywords, {report['queries']} queries")
+        for row in report["results"]:
+            line = (f"{row['precision']:>8}  {row['bytes'] / 2**20:8.2f} MiB "
+                    f"(scan {row['scan_bytes'] / 2**20:.2f} MiB)  "
+                    f"x{row['compression']:<5} {row['ms_per_query']} ms/query")
+            if "classification_agreement" in row:
+                line += (f"  classify={row['classification_agreement']:.4f}  "
+                         f"top1={row['top1_agreement']:.4f}  "
+                         f"unique={row['uniqueness_agreement']:.4f}  "
+                         f"max_err={row['max_abs_error']:.5f}")
+            print(line)
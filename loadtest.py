@@ -0,0 +1,281 @@
+"""
+Local load generator for capacity planning.
+
+Drives the Flask app either in-process (Flask test client, no network) or
+over HTTP against a running server, with a configurable request mix and
+document-length distribution, and reports throughput and latency
+percentiles per interval and overall.
+
+    # Serving layer only: mock models with 50 ms + 20 ms/1k chars latency
+    python loadtest.py --mock --mock-latency-ms 50 --mock-ms-per-kchar 20 \\
+        --concurrency 16 --duration 60
+
+    # Against a local server (start it with BLOGAI_MOCK_MODELS=1 for mock mode)
+    python loadtest.py --url http://localhost:7860 --concurrency 8 \\
+        --mix blog=0.5,extract=0.3,process=0.2 --mean-chars 3000
+
+With --rate, requests arrive open-loop (Poisson) and latency is measured
+from each request's scheduled start, so queueing delay is not hidden when
+all workers are busy. Without it each worker sends back-to-back.
+"""
+import argparse
+import json
+import math
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+
+WORDS = (
+    "artificial intelligence machine learning software programming cloud data science automation "
+    "healthcare medical doctor patient hospital treatment disease finance banking investment "
+    "stocks trading cryptocurrency economy education students university courses the of and "
+    "to in is that for with as on this by are be from at have it an which their more new"
+).split()
+
+CATEGORY_NAMES = ["Technology", "Healthcare", "Finance", "Education"]
+
+
+def make_document(rng, mean_chars, sigma, max_chars):
+    # Lognormal lengths: most posts are short, with a long tail
+    mu = math.log(mean_chars) - sigma ** 2 / 2
+    target = min(max_chars, max(50, int(rng.lognormvariate(mu, sigma))))
+    sentences = []
+    length = 0
+    while length < target:
+        sentence = " ".join(rng.choice(WORDS) for _ in range(rng.randint(8, 20))).capitalize() + "."
+        sentences.append(sentence)
+        length += len(sentence) + 1
+    return " ".join(sentences)[:target]
+
+
+def make_request(kind, rng, args):
+    text = make_document(rng, args.mean_chars, args.length_sigma, args.max_chars)
+    if kind == "blog":
+        body = {"title": "Load test", "content": text}
+        if args.latency_budget_ms:
+            body["latency_budget_ms"] = args.latency_budget_ms
+        return "/api/blog", body
+    if kind == "extract":
+        return "/api/keywords/extract", {"content": text, "category": rng.choice(CATEGORY_NAMES)}
+    if kind == "process":
+        return "/api/process-and-extract", {"text": text}
+    raise ValueError(f"Unknown request kind: {kind}")
+
+
+def parse_mix(mix):
+    weights = {}
+    for part in mix.split(","):
+        kind, weight = part.split("=")
+        weights[kind.strip()] = float(weight)
+    return weights
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[max(0, math.ceil(q * len(sorted_values)) - 1)]
+
+
+def summarize_samples(samples, elapsed):
+    latencies = sorted(s["latency"] * 1000 for s in samples)
+    return {
+        "requests": len(samples),
+        "throughput_rps": round(len(samples) / elapsed, 2) if elapsed > 0 else 0.0,
+        "p50_ms": round(percentile(latencies, 0.50), 1),
+        "p95_ms": round(percentile(latencies, 0.95), 1),
+        "p99_ms": round(percentile(latencies, 0.99), 1),
+        "max_ms": round(latencies[-1], 1) if latencies else 0.0,
+        "status": dict(Counter(str(s["status"]) for s in samples)),
+    }
+
+
+class Recorder:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.samples = []
+        self._interval = []
+
+    def add(self, sample):
+        with self._lock:
+            self.samples.append(sample)
+            self._interval.append(sample)
+
+    def drain_interval(self):
+        with self._lock:
+            interval, self._interval = self._interval, []
+        return interval
+
+
+class Schedule:
+    """Open-loop Poisson arrivals shared by all workers"""
+
+    def __init__(self, rate, rng):
+        self.rate = rate
+        self.rng = rng
+        self._lock = threading.Lock()
+        self._next = time.perf_counter()
+
+    def next_start(self):
+        with self._lock:
+            self._next += self.rng.expovariate(self.rate)
+            return self._next
+
+
+def make_sender(args):
+    if args.url:
+        import requests
+        session = requests.Session()
+        base = args.url.rstrip("/")
+
+        def send(path, body):
+            try:
+                return session.post(base + path, json=body, timeout=args.timeout).status_code
+            except requests.RequestException:
+                return "error"
+        return send
+
+    import app as blogai_app
+    client = blogai_app.app.test_client()
+
+    def send(path, body):
+        return client.post(path, json=body).status_code
+    return send
+
+
+def worker(args, kinds, weights, recorder, stop_at, schedule, seed):
+    rng = random.Random(seed)
+    send = make_sender(args)
+    while True:
+        if schedule:
+            scheduled = schedule.next_start()
+            if scheduled >= stop_at:
+                return
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+        else:
+            scheduled = time.perf_counter()
+            if scheduled >= stop_at:
+                return
+
+        kind = rng.choices(kinds, weights)[0]
+        path, body = make_request(kind, rng, args)
+        status = send(path, body)
+        recorder.add({
+            "kind": kind,
+            "chars": len(body.get("content") or body.get("text")),
+            "status": status,
+            "latency": time.perf_counter() - scheduled,
+        })
+
+
+def run(args):
+    if not args.url and args.mock:
+        os.environ["BLOGAI_MOCK_MODELS"] = "1"
+        os.environ["BLOGAI_MOCK_LATENCY_MS"] = str(args.mock_latency_ms)
+        os.environ["BLOGAI_MOCK_MS_PER_KCHAR"] = str(args.mock_ms_per_kchar)
+        if args.mock_burn_cpu:
+            os.environ["BLOGAI_MOCK_BURN_CPU"] = "1"
+    if not args.url:
+        # Keep synthetic documents out of the persisted near-duplicate index
+        os.environ["NEAR_DUP_INDEX_PATH"] = ""
+        # Load models (or mocks) before the clock starts
+        import app  # noqa: F401
+
+    weights_by_kind = parse_mix(args.mix)
+    kinds, weights = list(weights_by_kind), list(weights_by_kind.values())
+    recorder = Recorder()
+    rng = random.Random(args.seed)
+    schedule = Schedule(args.rate, rng) if args.rate else None
+
+    start = time.perf_counter()
+    stop_at = start + args.duration
+    threads = [
+        threading.Thread(target=worker, daemon=True,
+                         args=(args, kinds, weights, recorder, stop_at, schedule, args.seed + i))
+        for i in range(args.concurrency)
+    ]
+    for t in threads:
+        t.start()
+
+    timeline = []
+    last = start
+    while any(t.is_alive() for t in threads):
+        time.sleep(min(args.interval, max(0.05, stop_at - time.perf_counter())))
+        now = time.perf_counter()
+        if now - last >= args.interval or not any(t.is_alive() for t in threads):
+            stats = summarize_samples(recorder.drain_interval(), now - last)
+            stats["t"] = round(now - start, 1)
+            timeline.append(stats)
+            print(f"[{stats['t']:>6}s] {stats['throughput_rps']:>7} req/s  "
+                  f"p50={stats['p50_ms']}ms p95={stats['p95_ms']}ms p99={stats['p99_ms']}ms  "
+                  f"status={stats['status']}")
+            last = now
+
+    elapsed = time.perf_counter() - start
+    by_kind = defaultdict(list)
+    for sample in recorder.samples:
+        by_kind[sample["kind"]].append(sample)
+
+    report = {
+        "config": {k: v for k, v in vars(args).items() if k != "output"},
+        "overall": summarize_samples(recorder.samples, elapsed),
+        "by_kind": {kind: summarize_samples(samples, elapsed) for kind, samples in by_kind.items()},
+        "timeline": timeline,
+    }
+    if not args.url:
+        import app as blogai_app
+        with blogai_app.app.test_client() as client:
+            report["server_metrics"] = client.get("/api/metrics").get_json()
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load test the BlogAI API")
+    parser.add_argument("--url", help="Base URL of a running server; omit to drive the app in-process")
+    parser.add_argument("--concurrency", type=int, default=8, help="Worker threads")
+    parser.add_argument("--duration", type=float, default=30, help="Seconds to run")
+    parser.add_argument("--rate", type=float, default=None,
+                        help="Open-loop arrival rate in req/s (default: closed loop)")
+    parser.add_argument("--mix", default="blog=0.5,extract=0.3,process=0.2",
+                        help="Request mix as kind=weight (kinds: blog, extract, process)")
+    parser.add_argument("--mean-chars", type=int, default=2000, help="Mean document length")
+    parser.add_argument("--length-sigma", type=float, default=1.0, help="Lognormal sigma of lengths")
+    parser.add_argument("--max-chars", type=int, default=50000)
+    parser.add_argument("--latency-budget-ms", type=float, default=None,
+                        help="Send this latency budget with /api/blog requests")
+    parser.add_argument("--interval", type=float, default=5, help="Seconds between progress reports")
+    parser.add_argument("--timeout", type=float, default=300, help="HTTP timeout per request")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--mock", action="store_true", help="In-process only: use mock models")
+    parser.add_argument("--mock-latency-ms", type=float, default=20)
+    parser.add_argument("--mock-ms-per-kchar", type=float, default=10)
+    parser.add_argument("--mock-burn-cpu", action="store_true",
+                        help="Mock latency busy-loops instead of sleeping")
+    parser.add_argument("--output", help="Write the full JSON report here")
+    args = parser.parse_args(argv)
+
+    if args.url and args.mock:
+        print("--mock only applies in-process; start the server with BLOGAI_MOCK_MODELS=1 instead")
+        return 1
+
+    report = run(args)
+    overall = report["overall"]
+    print(f"\nTotal: {overall['requests']} requests, {overall['throughput_rps']} req/s, "
+          f"p50={overall['p50_ms']}ms p95={overall['p95_ms']}ms p99={overall['p99_ms']}ms")
+    for kind, stats in report["by_kind"].items():
+        print(f"  {kind:<8} {stats['requests']:>6} req  p50={stats['p50_ms']}ms "
+              f"p95={stats['p95_ms']}ms  status={stats['status']}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Report written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
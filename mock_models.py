@@ -0,0 +1,104 @@
+"""
+Stand-ins for the model classes with synthetic latency, used when the app
+runs with BLOGAI_MOCK_MODELS=1 (e.g. under loadtest.py) to exercise the
+serving layer without loading or running any model.
+
+Latency per call is BLOGAI_MOCK_LATENCY_MS + BLOGAI_MOCK_MS_PER_KCHAR for
+every 1000 characters of input, with +/-20% jitter. By default the mock
+sleeps; BLOGAI_MOCK_BURN_CPU=1 busy-loops instead, so concurrent requests
+compete for the GIL the way real inference competes for cores.
+"""
+import os
+import random
+import time
+from labels import CATEGORIES
+from summary_profiles import SummaryCostModel
+from summary_cache import ChunkSummaryCache
+
+
+def _setting(name, default):
+    return float(os.getenv(name, default))
+
+
+def simulate(text, scale=1.0):
+    base_ms = _setting("BLOGAI_MOCK_LATENCY_MS", "20")
+    per_kchar_ms = _setting("BLOGAI_MOCK_MS_PER_KCHAR", "10")
+    delay = scale * (base_ms + per_kchar_ms * len(text) / 1000) / 1000
+    delay *= random.uniform(0.8, 1.2)
+
+    if os.getenv("BLOGAI_MOCK_BURN_CPU") == "1":
+        end = time.perf_counter() + delay
+        while time.perf_counter() < end:
+            pass
+    else:
+        time.sleep(delay)
+
+
+def _pick_categories(text):
+    # Deterministic per text so coalescing and caching behave as in production
+    rng = random.Random(hash(text))
+    categories = list(CATEGORIES)
+    picked = rng.sample(categories, k=rng.randint(1, 2))
+    return [{"category": c, "confidence": round(rng.uniform(0.2, 0.9), 3)} for c in picked]
+
+
+class MockClassifier:
+    def __init__(self, threshold=0.2, vocabulary=None):
+        self.threshold = threshold
+
+    def classify(self, text):
+        simulate(text, scale=0.2)
+        return _pick_categories(text)
+
+    def classify_batch(self, texts, batch_size=32):
+        return [self.classify(text) for text in texts]
+
+
+class MockSummarizer:
+    def __init__(self):
+        self.cost_model = SummaryCostModel()
+        self.chunk_cache = ChunkSummaryCache()
+
+    def summarize(self, text, strategy="auto"):
+        simulate(text)
+        return [{"summary_text": text[:200]}]
+
+    def summarize_with_budget(self, text, latency_budget_ms=None, quality=None):
+        result = self.summarize(text)
+        result[0]["profile"] = {"name": "mock", "latency_budget_ms": latency_budget_ms, "quality": quality}
+        return result
+
+    def summarize_batch(self, texts, batch_size=8):
+        return [self.summarize(text) for text in texts]
+
+
+class MockKeywordExtractor:
+    def __init__(self, similarity_threshold=0.4, uniqueness_threshold=0.2):
+        self.categories = CATEGORIES
+
+    def extract_new_keywords(self, text, assigned_category, top_n=20):
+        simulate(text, scale=0.3)
+        words = sorted({w.lower() for w in text.split() if len(w) > 6})[:5]
+        return {
+            "category": assigned_category,
+            "new_keywords": [
+                {"keyword": w, "target_similarity": 0.5, "other_max_similarity": 0.2,
+                 "uniqueness_score": 0.3, "is_unique": True}
+                for w in words
+            ],
+            "total_candidates_analyzed": len(words),
+            "unique_keywords_found": len(words),
+            "total_keywords_found": len(words)
+        }
+
+    def add_keywords_to_category(self, category, keywords_list):
+        return {"category": category, "added_keywords": [], "total_keywords_now": len(CATEGORIES[category])}
+
+    def save_updated_categories(self, filepath="labels_updated.py"):
+        # Never touch labels.py during load tests
+        return {"message": "mock: not saved", "success": True}
+
+
+def extract_and_update_keywords(text, assigned_category, auto_add=False, min_uniqueness_score=0.2,
+                                extractor=None):
+    return (extractor or MockKeywordExtractor()).extract_new_keywords(text, assigned_category)
@@ -0,0 +1,143 @@
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+import zlib
+import numpy as np
+
+_PRIME = (1 << 31) - 1
+
+
+def shingles(text, size=5):
+    """Set of hashed word n-grams ("shingles") of the normalized text"""
+    words = re.sub(r'[^\w\s]', ' ', text.lower()).split()
+    if len(words) < size:
+        grams = [' '.join(words)] if words else []
+    else:
+        grams = (' '.join(words[i:i + size]) for i in range(len(words) - size + 1))
+    return {zlib.crc32(g.encode('utf-8')) % _PRIME for g in grams}
+
+
+class NearDuplicateIndex:
+    """
+    MinHash signatures with LSH banding over analyzed documents.
+
+    Each document gets a `num_perm`-value MinHash signature of its word
+    shingles; the fraction of equal values estimates Jaccard similarity.
+    Signatures are split into `bands` bands and documents sharing any band
+    become candidates, so a lookup only compares against a handful of
+    documents. Candidates at or above `threshold` estimated similarity are
+    returned together with the stored analysis result.
+
+    Records are appended to a JSONL file at `path` (None = memory only) and
+    replayed on start-up, so the index survives restarts and grows
+    incrementally.
+    """
+
+    def __init__(self, path=None, threshold=0.9, num_perm=128, bands=32, seed=1):
+        if num_perm % bands:
+            raise ValueError("num_perm must be divisible by bands")
+        self.path = path
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, _PRIME, size=num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, _PRIME, size=num_perm, dtype=np.uint64)
+
+        self._lock = threading.Lock()
+        self._records = {}
+        self._buckets = {}
+        self.stats = {"lookups": 0, "matches": 0, "added": 0}
+
+        if path and os.path.exists(path):
+            self._load()
+
+    def signature(self, text):
+        values = np.fromiter(shingles(text), dtype=np.uint64)
+        if values.size == 0:
+            return np.full(self.num_perm, _PRIME, dtype=np.uint64)
+        # (a * x + b) mod p for every permutation and shingle, min over shingles
+        hashed = (np.outer(self._a, values) + self._b[:, None]) % _PRIME
+        return hashed.min(axis=1)
+
+    def _band_keys(self, kind, signature):
+        return [
+            (kind, band, signature[band * self.rows:(band + 1) * self.rows].tobytes())
+            for band in range(self.bands)
+        ]
+
+    def _insert(self, record):
+        key = (record["kind"], record["id"])
+        self._records[key] = record
+        for band_key in self._band_keys(record["kind"], record["signature"]):
+            self._buckets.setdefault(band_key, set()).add(record["id"])
+
+    def _load(self):
+        with open(self.path, "rb+") as f:
+            data = f.read()
+            end = data.rfind(b"\n") + 1
+            if end < len(data):
+                # The last write was interrupted mid-line; discard it so the
+                # next append starts on a fresh line
+                f.truncate(end)
+        for line in data[:end].decode("utf-8").splitlines():
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            record["signature"] = np.array(record["signature"], dtype=np.uint64)
+            self._insert(record)
+
+    def lookup(self, text, kind):
+        """Best stored match of the same kind as (record, similarity), or None"""
+        signature = self.signature(text)
+        with self._lock:
+            self.stats["lookups"] += 1
+            candidates = set()
+            for band_key in self._band_keys(kind, signature):
+                candidates.update(self._buckets.get(band_key, ()))
+
+            best, best_sim = None, 0.0
+            for doc_id in candidates:
+                record = self._records[(kind, doc_id)]
+                sim = float(np.mean(record["signature"] == signature))
+                if sim > best_sim:
+                    best, best_sim = record, sim
+
+            if best is None or best_sim < self.threshold:
+                return None
+            self.stats["matches"] += 1
+            return best, best_sim
+
+    def add(self, text, kind, result, title=None):
+        doc_id = hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+        record = {
+            "id": doc_id,
+            "kind": kind,
+            "title": title,
+            "analyzed_at": time.time(),
+            "signature": self.signature(text),
+            "result": result,
+        }
+        with self._lock:
+            if (kind, doc_id) in self._records:
+                return doc_id
+            self._insert(record)
+            self.stats["added"] += 1
+            if self.path:
+                line = dict(record, signature=record["signature"].tolist())
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(line, ensure_ascii=False) + "\n")
+        return doc_id
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self.stats, documents=len(self._records), threshold=self.threshold)
@@ -1,18 +1,38 @@
 from transformers import pipeline
-from google import genai
-from chunker import overlapping_chunk_by_sentences
+from gemini_client import GeminiClient, GeminiError, DEFAULT_BASE_URL
+from chunker import content_defined_chunk_by_sentences
+from summary_cache import ChunkSummaryCache, chunk_key
+from summary_profiles import (
+    PROFILES, PROFILES_BY_NAME, QUALITY_TIERS, SummaryCostModel,
+    estimate_tokens, select_chunks, extractive_summary
+)
 import os
 from dotenv import load_dotenv
 import time
 
 load_dotenv()
 
+# Map-step generation lengths are fixed so chunks from any document share
+# batches and cache entries
+MAP_CACHE_PARAMS = {"step": "map", "max_length": 150, "min_length": 80}
+REDUCE_CACHE_PARAMS = {"step": "reduce"}
+# Short texts are summarized with max_length rounded down to one of these
+LENGTH_BUCKETS = (150, 100, 60, 30)
+
 class blogsummarizer:
     def __init__(self):
         self.summarizer = pipeline("summarization", model="facebook/bart-large-cnn", device=-1)
         
         api_key = os.getenv("GEMINI_API_KEY")
-        self.client = genai.Client(api_key=api_key) if api_key else None
+        self.client = GeminiClient(
+            api_key,
+            base_url=os.getenv("GEMINI_BASE_URL", DEFAULT_BASE_URL),
+            timeout=float(os.getenv("GEMINI_TIMEOUT", "20")),
+            max_concurrency=int(os.getenv("GEMINI_MAX_CONCURRENCY", "4")),
+            hedge_delay=float(os.getenv("GEMINI_HEDGE_DELAY", "3"))
+        ) if api_key else None
+        self.cost_model = SummaryCostModel()
+        self.chunk_cache = ChunkSummaryCache(int(os.getenv("CHUNK_CACHE_SIZE", "20000")))
 
     def summarize(self, text: str, strategy: str = "auto"):
         text = text.strip()
@@ -21,7 +41,10 @@ class blogsummarizer:
         
         if len(text) > 10000:
             if self.client:
-                return self._gemini_summarize(text)
+                try:
+                    return self._gemini_summarize(text)
+                except GeminiError as e:
+                    print(f"Gemini failed: {str(e)}, using BART chunks...")
             else:
                 print("Text > 10000 chars but no Gemini API key, using BART chunks...")
         
@@ -30,22 +53,334 @@ class blogsummarizer:
         else:
             return self._chunked_summarize(text, strategy)
 
+    def summarize_with_budget(self, text: str, latency_budget_ms=None, quality=None):
+        """
+        Summarize with the best generation profile expected to finish within
+        `latency_budget_ms`, optionally capped at a quality tier
+        ("fast", "balanced", "best"). The chosen profile, its estimate and
+        the measured time are returned under result[0]['profile'].
+        """
+        text = text.strip()
+        if not text:
+            raise ValueError("Text cannot be empty")
+        if quality is not None and quality not in QUALITY_TIERS:
+            raise ValueError(f"Unknown quality tier: {quality}")
+
+        start = time.time()
+        plan = self.choose_profile(text, latency_budget_ms, quality)
+        failures = []
+        while True:
+            try:
+                result = self._run_profile(plan, text, self._gemini_timeout(plan, text, latency_budget_ms, start))
+                break
+            except Exception as e:
+                if plan['profile']['kind'] == 'extractive':
+                    raise
+                print(f"Profile '{plan['profile']['name']}' failed: {str(e)}, re-planning...")
+                failures.append({'profile': plan['profile']['name'], 'error': str(e)})
+                remaining = None
+                if latency_budget_ms is not None:
+                    remaining = latency_budget_ms - (time.time() - start) * 1000
+                plan = self._fallback_plan(text, failures, remaining, quality)
+        elapsed = time.time() - start
+
+        result[0]['profile'] = {
+            'name': plan['profile']['name'],
+            'estimated_ms': round(plan['estimated_seconds'] * 1000, 1),
+            'actual_ms': round(elapsed * 1000, 1),
+            'latency_budget_ms': latency_budget_ms,
+            'quality': quality,
+            'num_beams': plan['profile'].get('num_beams'),
+            'max_length': plan['profile'].get('max_length'),
+            'chunks_used': len(plan['chunks']),
+            'chunks_total': plan['chunks_total']
+        }
+        if failures:
+            result[0]['profile']['fallback_from'] = failures
+        return result
+
+    def _gemini_timeout(self, plan, text, latency_budget_ms, start):
+        """
+        Deadline in seconds for a Gemini call inside a latency budget: what is
+        left of the budget, minus room for the local profile that runs if
+        Gemini fails (at most half of what is left). None without a budget.
+        """
+        if plan['profile']['kind'] != 'gemini' or latency_budget_ms is None:
+            return None
+        remaining = latency_budget_ms / 1000 - (time.time() - start)
+        fallback = self._plan(PROFILES_BY_NAME['greedy_short'], text, self._profile_chunks(text))
+        reserve = min(fallback['estimated_seconds'], remaining / 2)
+        return max(0.05, remaining - reserve)
+
+    def _fallback_plan(self, text, failures, remaining_ms, quality):
+        """
+        Next plan after a profile raised. Gemini failing drops to the best
+        local profile for the remaining budget; a BART failure goes to Gemini
+        if it is usable, and otherwise to the extractive summary.
+        """
+        failed_kinds = {PROFILES_BY_NAME[f['profile']]['kind'] for f in failures}
+        failed_kind = PROFILES_BY_NAME[failures[-1]['profile']]['kind']
+        chunks = self._profile_chunks(text)
+        if failed_kind == 'gemini' and 'bart' not in failed_kinds:
+            return self.choose_profile(text, remaining_ms, quality, allow_gemini=False)
+        if ('gemini' not in failed_kinds and self.client
+                and self.client.breaker.state != "open"):
+            return self._plan(PROFILES_BY_NAME['gemini'], text, chunks)
+        return self._plan(PROFILES_BY_NAME['extractive'], text, chunks)
+
+    def _profile_chunks(self, text: str):
+        if len(text) <= 1024:
+            return [text]
+        return content_defined_chunk_by_sentences(text, max_chunk_size=900, overlap_sentences=2)
+
+    def choose_profile(self, text: str, latency_budget_ms=None, quality=None, allow_gemini=True):
+        chunks = self._profile_chunks(text)
+
+        candidates = PROFILES
+        if quality is not None:
+            ceiling = PROFILES.index(PROFILES_BY_NAME[QUALITY_TIERS[quality]])
+            candidates = PROFILES[ceiling:]
+            if latency_budget_ms is None:
+                candidates = candidates[:1]
+
+        plans = []
+        for profile in candidates:
+            if profile['kind'] == 'gemini':
+                # Same policy as summarize(): remote only for very long texts
+                if not (allow_gemini and self.client and len(text) > 10000
+                        and self.client.breaker.state != "open"):
+                    continue
+            plan = self._plan(profile, text, chunks)
+            if latency_budget_ms is None or plan['estimated_seconds'] * 1000 <= latency_budget_ms:
+                return plan
+            plans.append(plan)
+
+        # Nothing fits the budget: take the cheapest option
+        if not plans:
+            return self._plan(PROFILES_BY_NAME['extractive'], text, chunks)
+        return min(plans, key=lambda p: p['estimated_seconds'])
+
+    def _plan(self, profile, text, chunks):
+        if profile['kind'] == 'bart':
+            used = select_chunks(chunks, profile['max_chunks'])
+            tokens = sum(estimate_tokens(c) for c in used)
+            if len(used) > 1:
+                # Reduce step re-reads the chunk summaries
+                tokens += len(used) * profile['max_length']
+        else:
+            used = chunks
+            tokens = estimate_tokens(text)
+        return {
+            'profile': profile,
+            'chunks': used,
+            'chunks_total': len(chunks),
+            'tokens': tokens,
+            'estimated_seconds': self.cost_model.estimate(profile['name'], tokens)
+        }
+
+    def _run_profile(self, plan, text, gemini_timeout=None):
+        profile = plan['profile']
+        start = time.time()
+        print(f"Summarizing with profile '{profile['name']}' "
+              f"(estimated {plan['estimated_seconds']:.2f}s, {len(plan['chunks'])} chunks)")
+
+        tokens_run = plan['tokens']
+        if profile['kind'] == 'extractive':
+            result = [{"summary_text": extractive_summary(text)}]
+        elif profile['kind'] == 'gemini':
+            result = self._gemini_summarize(text, timeout=gemini_timeout)
+        else:
+            cache_stats = {'chunk_hits': 0, 'chunk_misses': 0}
+            summaries, tokens_run = self._bart_generate_cached(plan['chunks'], profile, cache_stats)
+            if len(summaries) == 1:
+                result = [{"summary_text": summaries[0]}]
+            else:
+                combined = " ".join(summaries)
+                reduced, reduce_tokens = self._bart_generate_cached([combined], profile, cache_stats)
+                tokens_run += reduce_tokens
+                result = [{"summary_text": reduced[0]}]
+            lookups = cache_stats['chunk_hits'] + cache_stats['chunk_misses']
+            cache_stats['chunk_hit_rate'] = round(cache_stats['chunk_hits'] / lookups, 3) if lookups else 0.0
+            result[0]['metadata'] = {'chunk_cache': cache_stats}
+
+        # Cache hits skip the model, so only learn from work that actually ran
+        if tokens_run:
+            self.cost_model.observe(profile['name'], tokens_run, time.time() - start)
+        return result
+
+    def _bart_generate_cached(self, texts: list, profile, cache_stats):
+        # Lengths depend on the call, not on which texts missed the cache,
+        # and the key records the lengths actually used
+        max_len, min_len = self._profile_lengths(texts, profile)
+        params = {'num_beams': profile['num_beams'], 'max_length': max_len, 'min_length': min_len}
+        keys = [chunk_key(t, params) for t in texts]
+        summaries = [self.chunk_cache.get(k) for k in keys]
+        missing = [i for i, summary in enumerate(summaries) if summary is None]
+        cache_stats['chunk_hits'] += len(texts) - len(missing)
+        cache_stats['chunk_misses'] += len(missing)
+        if not missing:
+            return summaries, 0
+
+        fresh = self._bart_generate([texts[i] for i in missing], profile, max_len, min_len)
+        for i, summary in zip(missing, fresh):
+            summaries[i] = summary
+            self.chunk_cache.put(keys[i], summary)
+        return summaries, sum(estimate_tokens(texts[i]) for i in missing)
+
+    def _profile_lengths(self, texts: list, profile):
+        max_len = profile['max_length']
+        if len(texts) == 1:
+            # A lone short input shouldn't be asked for a longer summary
+            max_len = min(max_len, len(texts[0].split()))
+        return max_len, max(1, min(profile['min_length'], max_len - 10))
+
+    def _bart_generate(self, texts: list, profile, max_len, min_len):
+        # Chunks are summarized as one batch; input is truncated to BART's limit
+        outputs = self.summarizer(
+            texts,
+            max_length=max_len,
+            min_length=min_len,
+            num_beams=profile['num_beams'],
+            do_sample=False,
+            truncation=True,
+            batch_size=len(texts)
+        )
+        return [o['summary_text'] for o in outputs]
+
+    def summarize_batch(self, texts: list, batch_size=8):
+        """
+        Summarize several texts with BART calls batched across documents.
+        Every chunk of every long text goes through one map step with fixed
+        lengths, then the reduce steps and the short texts are batched by
+        generation length (short texts use bucketed lengths). Texts bound for
+        Gemini, and any whose batch failed, go through summarize() one at a
+        time. Returns one result per text.
+        """
+        results = [None] * len(texts)
+        singles = {}
+        chunked = {}
+        for i, text in enumerate(texts):
+            text = text.strip()
+            if not text or (len(text) > 10000 and self.client):
+                continue
+            if len(text) <= 1024:
+                chunks = [text]
+            else:
+                chunks = [c for c in content_defined_chunk_by_sentences(text, max_chunk_size=900, overlap_sentences=2)
+                          if c.strip()]
+            if len(chunks) == 1:
+                singles[i] = chunks[0]
+            else:
+                chunked[i] = chunks
+
+        map_inputs = {(i, j): chunk for i, chunks in chunked.items() for j, chunk in enumerate(chunks)}
+        fixed = (MAP_CACHE_PARAMS['max_length'], MAP_CACHE_PARAMS['min_length'])
+        mapped = self._bart_batch(map_inputs, lambda _: fixed, batch_size, MAP_CACHE_PARAMS)
+
+        reduce_inputs = {}
+        for i, chunks in chunked.items():
+            if any((i, j) not in mapped for j in range(len(chunks))):
+                continue
+            combined = " ".join(mapped[(i, j)] for j in range(len(chunks)))
+            if len(combined) <= 1500:
+                reduce_inputs[i] = combined
+            else:
+                results[i] = [{"summary_text": combined[:1000] + "..."}]
+
+        reduced = self._bart_batch(reduce_inputs, self._bart_lengths, batch_size, REDUCE_CACHE_PARAMS)
+        short = self._bart_batch(singles, self._bucketed_lengths, batch_size)
+        for i, summary in list(reduced.items()) + list(short.items()):
+            results[i] = [{"summary_text": summary}]
+
+        for i, text in enumerate(texts):
+            if results[i] is None:
+                results[i] = self.summarize(text)
+        return results
+
+    def _bart_batch(self, texts: dict, lengths, batch_size, cache_params=None):
+        """
+        One BART pass per text, batched across texts. `lengths(text)` gives
+        (max_length, min_length) and texts with the same pair share pipeline
+        calls. With `cache_params` summaries go through the chunk cache.
+        Returns {key: summary}; keys whose batch failed are left out.
+        """
+        summaries = {}
+        groups = {}
+        for key, text in texts.items():
+            if cache_params is not None:
+                cached = self.chunk_cache.get(chunk_key(text, cache_params))
+                if cached is not None:
+                    summaries[key] = cached
+                    continue
+            groups.setdefault(lengths(text), []).append(key)
+
+        for (max_len, min_len), keys in groups.items():
+            try:
+                outputs = self.summarizer(
+                    [texts[key] for key in keys],
+                    max_length=max_len,
+                    min_length=min_len,
+                    do_sample=False,
+                    truncation=True,
+                    batch_size=batch_size
+                )
+            except Exception as e:
+                print(f"Batch summarization failed: {str(e)}, falling back to sequential...")
+                continue
+            for key, output in zip(keys, outputs):
+                summaries[key] = output['summary_text']
+                if cache_params is not None:
+                    self.chunk_cache.put(chunk_key(texts[key], cache_params), output['summary_text'])
+        return summaries
+
+    def _bucketed_lengths(self, text: str):
+        words = len(text.split())
+        max_len = next((b for b in LENGTH_BUCKETS if b <= words), LENGTH_BUCKETS[-1])
+        return max_len, min(80, max_len - 10)
+
+    def _bart_lengths(self, text: str):
+        max_len = min(150, len(text.split()))
+        min_len = min(80, max_len - 10)
+        return max_len, min_len
+
     def _bart_summarize(self, text: str):
         try:
-            max_len = min(150, len(text.split()))
-            min_len = min(80, max_len - 10)
-            result = self.summarizer(text, max_length=max_len, min_length=min_len, do_sample=False)
-            return result
+            return self._bart_pass(text)
         except Exception as e:
             print(f"BART failed: {str(e)}")
-            if self.client:
+            return self._gemini_fallback(text, e)
+
+    def _map_pass(self, chunks: list):
+        """
+        Map-step summaries, always generated exactly as MAP_CACHE_PARAMS
+        describes so cached entries are interchangeable across call paths
+        """
+        outputs = self.summarizer(
+            chunks,
+            max_length=MAP_CACHE_PARAMS['max_length'],
+            min_length=MAP_CACHE_PARAMS['min_length'],
+            do_sample=False,
+            truncation=True,
+            batch_size=len(chunks)
+        )
+        return [o['summary_text'] for o in outputs]
+
+    def _bart_pass(self, text: str):
+        max_len, min_len = self._bart_lengths(text)
+        return self.summarizer(text, max_length=max_len, min_length=min_len, do_sample=False, truncation=True)
+
+    def _gemini_fallback(self, text: str, error):
+        if self.client:
+            try:
                 return self._gemini_summarize(text)
-            raise
+            except GeminiError as gemini_error:
+                print(f"Gemini fallback failed: {str(gemini_error)}")
+        raise error
 
     def _chunked_summarize(self, text: str, strategy: str):
         # Measure chunking time
         chunk_start = time.time()
-        chunks = overlapping_chunk_by_sentences(text, max_chunk_size=900, overlap_sentences=2)
+        chunks = content_defined_chunk_by_sentences(text, max_chunk_size=900, overlap_sentences=2)
         chunk_time = time.time() - chunk_start
         
         print(f"\n{'='*50}")
@@ -59,23 +394,30 @@ class blogsummarizer:
         
         try:
             # Use batch processing for faster inference
-            result = self._bart_map_reduce_summarize(chunks, use_batch=True)
+            cache_stats = {}
+            result = self._bart_map_reduce_summarize(chunks, use_batch=True, cache_stats=cache_stats)
+            lookups = cache_stats['chunk_hits'] + cache_stats['chunk_misses']
+            cache_stats['chunk_hit_rate'] = round(cache_stats['chunk_hits'] / lookups, 3) if lookups else 0.0
             result[0]['metadata'] = {
                 'original_length': len(text),
                 'num_chunks': len(chunks),
-                'chunk_lengths': [len(c) for c in chunks]
+                'chunk_lengths': [len(c) for c in chunks],
+                'chunk_cache': cache_stats
             }
             return result
         except Exception as e:
             print(f"BART chunked summarization failed: {str(e)}")
             if self.client:
                 print("Falling back to Gemini...")
-                return self._gemini_summarize(text)
+                try:
+                    return self._gemini_summarize(text)
+                except GeminiError as gemini_error:
+                    print(f"Gemini fallback failed: {str(gemini_error)}")
             raise
 
-    def _bart_map_reduce_summarize(self, chunks: list, use_batch=True):
+    def _bart_map_reduce_summarize(self, chunks: list, use_batch=True, cache_stats=None):
         print(f"Processing {len(chunks)} chunks with BART...")
-        chunk_summaries = []
+        cache_stats = cache_stats if cache_stats is not None else {}
         
         # Measure first level summarization time
         first_level_start = time.time()
@@ -83,26 +425,32 @@ class blogsummarizer:
         # Filter empty chunks
         valid_chunks = [(i, chunk) for i, chunk in enumerate(chunks) if len(chunk.strip()) > 0]
         
-        if use_batch and len(valid_chunks) > 1:
+        # Re-use summaries of chunks seen before (unchanged parts of edited posts)
+        keys = {i: chunk_key(chunk, MAP_CACHE_PARAMS) for i, chunk in valid_chunks}
+        summaries_by_index = {}
+        for i, _ in valid_chunks:
+            cached = self.chunk_cache.get(keys[i])
+            if cached is not None:
+                summaries_by_index[i] = cached
+        to_run = [(i, chunk) for i, chunk in valid_chunks if i not in summaries_by_index]
+        cache_stats['chunk_hits'] = len(valid_chunks) - len(to_run)
+        cache_stats['chunk_misses'] = len(to_run)
+        print(f"Chunk cache: {cache_stats['chunk_hits']} hits, {len(to_run)} chunks to summarize")
+        
+        if use_batch and len(to_run) > 1:
             # Batch processing - much faster for multiple chunks
-            print(f"Using batch processing for {len(valid_chunks)} chunks...")
+            print(f"Using batch processing for {len(to_run)} chunks...")
             try:
-                texts = [chunk for _, chunk in valid_chunks]
-                max_len = 150
-                min_len = 80
+                texts = [chunk for _, chunk in to_run]
                 
                 # Process all chunks in one batch call
                 batch_start = time.time()
-                results = self.summarizer(
-                    texts, 
-                    max_length=max_len, 
-                    min_length=min_len, 
-                    do_sample=False,
-                    batch_size=len(texts)  # Process all at once
-                )
+                results = self._map_pass(texts)
                 batch_time = time.time() - batch_start
                 
-                chunk_summaries = [r['summary_text'] for r in results]
+                for (i, _), summary in zip(to_run, results):
+                    summaries_by_index[i] = summary
+                    self.chunk_cache.put(keys[i], summary)
                 print(f"  Batch processing completed in {batch_time:.3f} seconds")
                 print(f"  Average per chunk: {batch_time/len(texts):.3f} seconds")
                 
@@ -110,15 +458,23 @@ class blogsummarizer:
                 print(f"Batch processing failed: {str(e)}, falling back to sequential...")
                 use_batch = False
         
-        if not use_batch or len(valid_chunks) <= 1:
+        if not use_batch or len(to_run) <= 1:
             # Sequential processing (original method)
-            for i, chunk in valid_chunks:
+            for i, chunk in to_run:
                 chunk_start = time.time()
                 print(f"Summarizing chunk {i+1}/{len(chunks)}...")
-                summary = self._bart_summarize(chunk)
-                chunk_summaries.append(summary[0]['summary_text'])
+                try:
+                    summary = self._map_pass([chunk])[0]
+                    self.chunk_cache.put(keys[i], summary)
+                except Exception as e:
+                    # A Gemini stand-in is used for this request but never cached as BART output
+                    print(f"BART failed: {str(e)}")
+                    summary = self._gemini_fallback(chunk, e)[0]['summary_text']
+                summaries_by_index[i] = summary
                 print(f"  Chunk {i+1} took {time.time() - chunk_start:.3f} seconds")
         
+        chunk_summaries = [summaries_by_index[i] for i, _ in valid_chunks]
+        
         first_level_time = time.time() - first_level_start
         print(f"\n{'='*50}")
         print(f"TIMING: First level summarization (all chunks) completed in {first_level_time:.3f} seconds")
@@ -129,9 +485,20 @@ class blogsummarizer:
         
         # Measure second level summarization time
         if len(combined) <= 1500:
+            reduce_key = chunk_key(combined, REDUCE_CACHE_PARAMS)
+            cached = self.chunk_cache.get(reduce_key)
+            cache_stats['reduce_hit'] = cached is not None
+            if cached is not None:
+                return [{"summary_text": cached}]
+            
             print("Creating final summary from combined chunks...")
             second_level_start = time.time()
-            final_summary = self._bart_summarize(combined)
+            try:
+                final_summary = self._bart_pass(combined)
+                self.chunk_cache.put(reduce_key, final_summary[0]['summary_text'])
+            except Exception as e:
+                print(f"BART failed: {str(e)}")
+                final_summary = self._gemini_fallback(combined, e)
             second_level_time = time.time() - second_level_start
             print(f"\n{'='*50}")
             print(f"TIMING: Second level summarization completed in {second_level_time:.3f} seconds")
@@ -141,11 +508,8 @@ class blogsummarizer:
             print("Combined summary too long, truncating...")
             return [{"summary_text": combined[:1000] + "..."}]
 
-    def _gemini_summarize(self, text: str):
+    def _gemini_summarize(self, text: str, timeout=None):
         print("Using Gemini for summarization...")
         prompt = f"Summarize the following text in 80-150 words:\n\n{text}"
-        response = self.client.models.generate_content(
-            model='gemini-3-flash-preview',
-            contents=prompt
-        )
-        return [{"summary_text": response.text}]
\ No newline at end of file
+        summary = self.client.generate(prompt, timeout=timeout)
+        return [{"summary_text": summary}]
\ No newline at end of file
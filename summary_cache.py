@@ -0,0 +1,52 @@
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+
+
+def chunk_key(text, params):
+    """Hash of a chunk's text plus the generation parameters that shaped its summary"""
+    payload = json.dumps(params, sort_keys=True) + "\x00" + text
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ChunkSummaryCache:
+    """
+    Thread-safe LRU of chunk hash -> summary text. Edited documents re-use
+    the summaries of every chunk whose content did not change.
+    """
+
+    def __init__(self, max_entries=20000):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            summary = self._entries.get(key)
+            if summary is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return summary
+
+    def put(self, key, summary):
+        with self._lock:
+            self._entries[key] = summary
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def snapshot(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
@@ -0,0 +1,121 @@
+import re
+import threading
+from collections import Counter
+
+# Generation profiles, best quality first. Costs are estimated from the
+# number of input tokens a profile actually processes (max_chunks caps that
+# for long documents) and refined online from observed timings.
+PROFILES = [
+    {"name": "gemini", "kind": "gemini"},
+    {"name": "beam4", "kind": "bart", "num_beams": 4, "max_length": 150, "min_length": 80, "max_chunks": None},
+    {"name": "beam2", "kind": "bart", "num_beams": 2, "max_length": 150, "min_length": 80, "max_chunks": None},
+    {"name": "greedy", "kind": "bart", "num_beams": 1, "max_length": 120, "min_length": 50, "max_chunks": 8},
+    {"name": "greedy_short", "kind": "bart", "num_beams": 1, "max_length": 60, "min_length": 20, "max_chunks": 3},
+    {"name": "extractive", "kind": "extractive"},
+]
+PROFILES_BY_NAME = {profile["name"]: profile for profile in PROFILES}
+
+# Quality tiers map to a fixed profile when no latency budget is given
+QUALITY_TIERS = {
+    "fast": "greedy_short",
+    "balanced": "beam2",
+    "best": "beam4",
+}
+
+# Seconds per input token (CPU, bart-large-cnn) and fixed per-call overhead,
+# used until real measurements come in
+_PRIOR_SECONDS_PER_TOKEN = {
+    "gemini": 0.0005,
+    "beam4": 0.008,
+    "beam2": 0.005,
+    "greedy": 0.003,
+    "greedy_short": 0.0015,
+    "extractive": 0.000002,
+}
+_OVERHEAD_SECONDS = {
+    "gemini": 1.5,
+    "beam4": 0.3,
+    "beam2": 0.3,
+    "greedy": 0.2,
+    "greedy_short": 0.1,
+    "extractive": 0.0,
+}
+
+
+def estimate_tokens(text):
+    # BART's BPE averages roughly 1.3 tokens per whitespace word for English
+    return int(len(text.split()) * 1.3) + 1
+
+
+def select_chunks(chunks, max_chunks):
+    """Evenly spaced subset of chunks, always keeping the first and last"""
+    if not max_chunks or len(chunks) <= max_chunks:
+        return chunks
+    if max_chunks == 1:
+        return chunks[:1]
+    step = (len(chunks) - 1) / (max_chunks - 1)
+    return [chunks[round(i * step)] for i in range(max_chunks)]
+
+
+def extractive_summary(text, max_sentences=4):
+    """Pick the highest-scoring sentences by normalized word frequency"""
+    sentences = [s for s in re.split(r'(?<=[.!?])\s+', text.strip()) if s.strip()]
+    if len(sentences) <= max_sentences:
+        return " ".join(sentences)
+
+    words = re.findall(r"\w+", text.lower())
+    freq = Counter(w for w in words if len(w) > 3)
+    top = max(freq.values()) if freq else 1
+
+    scored = []
+    for i, sentence in enumerate(sentences):
+        tokens = [w for w in re.findall(r"\w+", sentence.lower()) if len(w) > 3]
+        if not tokens:
+            continue
+        score = sum(freq[w] / top for w in tokens) / len(tokens) ** 0.5
+        scored.append((score, i))
+
+    best = sorted(i for _, i in sorted(scored, reverse=True)[:max_sentences])
+    return " ".join(sentences[i] for i in best)
+
+
+class SummaryCostModel:
+    """
+    Per-profile latency estimate: overhead + seconds_per_token * tokens.
+    seconds_per_token is an exponentially weighted average of observed
+    (elapsed - overhead) / tokens, so it tracks the actual hardware.
+    """
+
+    def __init__(self, alpha=0.2):
+        self.alpha = alpha
+        self.seconds_per_token = dict(_PRIOR_SECONDS_PER_TOKEN)
+        self.observations = {name: 0 for name in self.seconds_per_token}
+        self._lock = threading.Lock()
+
+    def estimate(self, profile_name, tokens):
+        with self._lock:
+            return _OVERHEAD_SECONDS[profile_name] + self.seconds_per_token[profile_name] * tokens
+
+    def observe(self, profile_name, tokens, elapsed):
+        if tokens <= 0:
+            return
+        sample = max(0.0, elapsed - _OVERHEAD_SECONDS[profile_name]) / tokens
+        with self._lock:
+            if self.observations[profile_name] == 0:
+                # First real measurement replaces the prior outright
+                self.seconds_per_token[profile_name] = sample
+            else:
+                current = self.seconds_per_token[profile_name]
+                self.seconds_per_token[profile_name] = (1 - self.alpha) * current + self.alpha * sample
+            self.observations[profile_name] += 1
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                name: {
+                    "seconds_per_token": round(spt, 6),
+                    "overhead_seconds": _OVERHEAD_SECONDS[name],
+                    "observations": self.observations[name],
+                }
+                for name, spt in self.seconds_per_token.items()
+            }